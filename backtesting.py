@@ -1,13 +1,41 @@
+import argparse
 import importlib
 import json
 import logging
 import os
-from datetime import timedelta, datetime
+from datetime import datetime
 
 from bot.backtest_bot import BackTestBot
-from core.util import str_to_date, parse_timeframe
+from core.profiler import Profiler
+from core.util import str_to_date, BarTime
+
+
+# Load strategy class
+def load_strategy(config):
+    m = 'strategy.'
+    m += 'example.' + config['strategy'] if config['example'] else config['strategy']
+    return getattr(importlib.import_module(m), config['strategy'])
+
+
+# Execute strategy from start to end
+# Bar by bar over the stored timestamps in [start, end] (gaps in the data are skipped)
+def run_backtest(bot: BackTestBot, strategy, config, start: datetime, end: datetime):
+    if config.get('vectorized', False) and hasattr(strategy, 'signals'):
+        # Signals over the whole history at once
+        bot.run_signals(strategy, start, end)
+    else:
+        # Merged timeline of all pairs (timestamps of the pair for single-symbol backtesting)
+        timeline = bot.build_timeline(start, end).tolist()
+        for k, timestamp in enumerate(timeline):
+            bot.step(k)
+            strategy.run(BarTime(timestamp))
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', action='store_true', help='time each stage of backtesting per bar')
+    args = parser.parse_args()
+
     # Load configuration file
     with open('./backtest_config.json') as f:
         config = json.load(f)
@@ -33,31 +61,42 @@ if __name__ == "__main__":
     bot = BackTestBot(config)
 
     # Load strategy
-    m = 'strategy.'
-    m += 'example.' + config['strategy'] if config['example'] else config['strategy']
-    strategy_cls = getattr(importlib.import_module(m), config['strategy'])
+    strategy_cls = load_strategy(config)
     strategy = strategy_cls(bot)
 
     # Execute strategy
     start = str_to_date(config['start_time'])
     end = str_to_date(config['end_time'])
-    timeframe_in_seconds = parse_timeframe(config['interval'])
-    current = start
-    i = 0
-    while current <= end:
-        current = start + timedelta(seconds=i * timeframe_in_seconds)
-        bot.next(current)
-        strategy.run(current)
-        i += 1
+    if args.profile:
+        profiler = Profiler()
+        profiler.attach(bot, strategy)
+        try:
+            run_backtest(bot, strategy, config, start, end)
+        finally:
+            profiler.detach()
+    else:
+        run_backtest(bot, strategy, config, start, end)
 
     # Output order history
     bot.output_order_history(result_dir, "filled")
 
     # Output performance
-    bot.output_performance(result_dir, start, end)
+    bot.output_performance(result_dir, start, end, config.get('render', True))
 
     # Output visualization of the result
-    bot.output_view(result_dir, global_dir, config['plot'])
+    bot.output_view(result_dir, global_dir, config['plot'], start, end)
 
     # Output backtesting information
     bot.output_config(result_dir, config)
+
+    # Output profile
+    if args.profile:
+        report = profiler.report()
+        print(f'Profile of {report["bars"]} bars (seconds)')
+        for stage, t in report['stages'].items():
+            print(f'{stage:>20} total {t["total"]:.4f} calls {t["calls"]} p50 {t["p50"]:.6f} p90 {t["p90"]:.6f} '
+                  f'p99 {t["p99"]:.6f} max {t["max"]:.6f}')
+        for spot in report['hot_spots']:
+            print(f'{spot["time"]} {spot["strategy.run"]:.6f} ({spot["stage"]})')
+        with open(f'{result_dir}profile.json', 'w') as outfile:
+            json.dump(report, outfile, indent=4)
@@ -0,0 +1,149 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from backtesting import load_strategy, run_backtest
+from bot.backtest_bot import BackTestBot
+from core import history
+from core.util import parse_timeframe
+
+# Example strategies and their time frames
+STRATEGIES = {
+    'BBClassic': '3m',
+    'BBCompound': '5m',
+    'MomClassic': '1m',
+    'VTClassicLong': '15m',
+    'VTCompLong': '15m'
+}
+
+# Pair traded by the example strategies
+PAIR = 'BTC/USDT'
+
+# K-lines before the backtest start for indicators (covers the record limits of the example strategies)
+WARM_UP = 1000
+
+# First k-line of synthetic history (ms)
+START = 1609459200000
+
+BASELINE_PATH = './benchmark_baseline.json'
+
+
+# Deterministic random walk OHLCV
+def synthetic(length: int, timeframe: str, seed: int = 0) -> history.History:
+    rng = np.random.default_rng(seed)
+    period = parse_timeframe(timeframe)
+    timestamp = START + np.arange(length, dtype=np.int64) * period * 1000
+
+    # Volatility scales with the square root of the time frame (0.1% per minute)
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.001 * np.sqrt(period / 60), length)))
+    values = np.empty((5, length), dtype=np.float64)
+    values[0] = np.r_[close[0], close[:-1]]
+    values[1] = np.maximum(values[0], close) * (1 + rng.uniform(0, 0.002, length))
+    values[2] = np.minimum(values[0], close) * (1 - rng.uniform(0, 0.002, length))
+    values[3] = close
+    values[4] = rng.uniform(1, 100, length)
+    return history.History(timestamp, values)
+
+
+# Run one strategy over synthetic history (in its own process)
+def run(strategy: str, bars: int, seed: int) -> dict:
+    timeframe = STRATEGIES[strategy]
+    h = synthetic(WARM_UP + bars, timeframe, seed)
+    start = datetime.fromtimestamp(h.timestamp[WARM_UP] / 1000)
+    end = datetime.fromtimestamp(h.timestamp[-1] / 1000)
+
+    config = {
+        'strategy': strategy,
+        'example': True,
+        'interval': timeframe,
+        'balance': 1000,
+        'pair': PAIR,
+        'taker_fee': 0.04,
+        'maker_fee': 0.02,
+        'data_dir': ''
+    }
+    bot = BackTestBot(config)
+    bot.set_history(PAIR, timeframe, h)
+    s = load_strategy(config)(bot)
+
+    t = time.perf_counter()
+    run_backtest(bot, s, config, start, end)
+    run_time = time.perf_counter() - t
+
+    t = time.perf_counter()
+    perf = bot.get_performance(start, end)
+    perf_time = time.perf_counter() - t
+
+    return {
+        'bars': bars,
+        'time': run_time,
+        'bars_per_second': bars / run_time,
+        'get_performance': perf_time,
+        # Peak resident memory of the process (KB)
+        'peak_memory': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        # Results must not change between runs
+        'orders': sum(1 for o in bot.get_order_history() if o['status'] == 'filled'),
+        'pnl': float(perf.pnl)
+    }
+
+
+# Compare with baseline
+# Return list of regressions
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for strategy, r in results.items():
+        if strategy not in baseline:
+            continue
+        b = baseline[strategy]
+        notes = []
+        if r['bars'] == b['bars'] and (r['orders'] != b['orders'] or r['pnl'] != b['pnl']):
+            notes.append(f'result changed (orders {b["orders"]} -> {r["orders"]}, pnl {b["pnl"]} -> {r["pnl"]})')
+        if r['bars_per_second'] < b['bars_per_second'] * (1 - tolerance):
+            notes.append(f'bars/s {b["bars_per_second"]:.0f} -> {r["bars_per_second"]:.0f}')
+        # Ignore timer noise of short calls
+        if r['get_performance'] > b['get_performance'] * (1 + tolerance) + 0.001:
+            notes.append(f'get_performance {b["get_performance"]:.4f}s -> {r["get_performance"]:.4f}s')
+        if r['peak_memory'] > b['peak_memory'] * (1 + tolerance):
+            notes.append(f'peak memory {b["peak_memory"]}KB -> {r["peak_memory"]}KB')
+        regressions += [f'{strategy}: {n}' for n in notes]
+    return regressions
+
+
+# Benchmark entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('strategies', nargs='*', default=list(STRATEGIES.keys()), help='strategies to run')
+    parser.add_argument('--bars', type=int, default=2000, help='k-lines to backtest per strategy')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of synthetic history')
+    parser.add_argument('--save', action='store_true', help='store results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    results = {}
+    for strategy in args.strategies:
+        # Fresh process per strategy for isolated peak memory and strategy state
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            r = executor.submit(run, strategy, args.bars, args.seed).result()
+        results[strategy] = r
+        print(f'{strategy:>14} {r["bars_per_second"]:10.0f} bars/s  get_performance {r["get_performance"]:.4f}s  '
+              f'peak memory {r["peak_memory"] / 1024:.0f}MB  orders {r["orders"]}  pnl {r["pnl"]:.4f}')
+
+    if args.save:
+        with open(BASELINE_PATH, 'w') as outfile:
+            json.dump(results, outfile, indent=4)
+        print(f'Stored baseline to {BASELINE_PATH}')
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for r in regressions:
+            print(f'Regression: {r}')
+        if len(regressions) > 0:
+            raise SystemExit(1)
+        print('No regression against baseline.')
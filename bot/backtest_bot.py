@@ -1,14 +1,15 @@
-import csv
 import json
 import os
 from datetime import datetime
 
-import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 
-from core.model import Order
-from core.performance import get_performance
-from core.util import str_to_timestamp
+from core import history, view
+from core.history import OPEN, HIGH, LOW, CLOSE
+from core.model import OrderStore, OrderView, OHLCV, PerfInfo
+from core.performance import get_performance, get_equity_perf
+from core.plot import plot_pnl
+from core.util import str_to_timestamp, parse_timeframe
 
 
 # Backtesting Bot
@@ -30,6 +31,9 @@ class BackTestBot(object):
         # Interval
         self.__interval = config["interval"]
 
+        # Resolve limit order fills against 1m k-lines within each k-line
+        self.__intrabar = config.get('intrabar', False) and self.__interval != history.RESAMPLE_BASE
+
         # Record current time
         self.__current_time = str_to_timestamp('2019-09-10 00:00:00')
 
@@ -39,15 +43,31 @@ class BackTestBot(object):
         # Pair for comparison
         self.__pair = config['pair']
 
+        # Pairs of multi-symbol backtesting (Buy & Hold splits the balance equally)
+        self.__pairs = config.get('pairs', [self.__pair])
+
+        # Merged timestamps of all pairs and index of each pair's record at every timestamp
+        self.__timeline = None
+        self.__timeline_index = {}
+
+        # Current position on the timeline (None when moved off the timeline by next)
+        self.__step = 0
+
         # Fee
         self.__taker_fee = config['taker_fee']
         self.__maker_fee = config['maker_fee']
 
-        # Order ID Issuer
-        self.__order_id = 0
+        # Order history (order ID is the index)
+        self.__order_history = OrderStore()
+
+        # Unfilled orders by ID (in order of creation)
+        self.__open_orders = {}
+
+        # Fills for the equity curve: <timestamp of the k-line, symbol, signed amount, cash flow (with fee)>
+        self.__fills = []
 
-        # Order history
-        self.__order_history = []
+        # Last equity curve <(start time, end time, number of fills), curve>
+        self.__equity = None
 
         # Order record storage
         self.__order_record = {}
@@ -55,127 +75,269 @@ class BackTestBot(object):
         # Setting
         self.__setting = {}
 
+        # Setting overrides (e.g. from a parameter sweep)
+        self.__setting_override = config.get('setting', {})
+
+    # Move to the time (on the timeline if it is one of its timestamps, otherwise records are located by time)
     def next(self, next_time: datetime):
-        for o in self.__order_history:
-            if o['type'] == "market" and o['status'] == "unfilled":
+        self.__fill_orders()
+
+        # Update current time
+        self.__current_time = int(next_time.timestamp() * 1000)
+        self.__step = None
+        if self.__timeline is not None:
+            k = int(np.searchsorted(self.__timeline, self.__current_time, side='left'))
+            if k < len(self.__timeline) and self.__timeline[k] == self.__current_time:
+                self.__step = k
+
+    # Align histories of all pairs on one merged timeline in [start, end]
+    # Return merged timestamps (ms)
+    def build_timeline(self, start_time: datetime, end_time: datetime) -> np.ndarray:
+        start = int(start_time.timestamp() * 1000)
+        end = int(end_time.timestamp() * 1000)
+
+        timestamps = []
+        for pair in self.__pairs:
+            h = self.__get_history(pair, self.__interval)
+            timestamps.append(h.timestamp[np.searchsorted(h.timestamp, start, side='left'):
+                                          np.searchsorted(h.timestamp, end, side='right')])
+        self.__timeline = np.unique(np.concatenate(timestamps))
+
+        # Index of the last record at or before each timestamp (-1 before the first record)
+        self.__timeline_index = {}
+        for pair in self.__pairs:
+            h = self.__get_history(pair, self.__interval)
+            self.__timeline_index[pair] = np.searchsorted(h.timestamp, self.__timeline, side='right') - 1
+        return self.__timeline
+
+    # Move to the k-th timestamp of the timeline
+    def step(self, k: int):
+        self.__fill_orders()
+
+        # Update current time
+        self.__step = k
+        self.__current_time = int(self.__timeline[k])
+
+    def __fill_orders(self):
+        if self.__intrabar:
+            self.__fill_orders_intrabar()
+            return
+
+        for o in list(self.__open_orders.values()):
+            if o['type'] == "market":
                 # Fill all unfilled market orders
                 o['status'] = "filled"
-            elif o['type'] == "limit" and o['status'] == "unfilled":
+                del self.__open_orders[o['id']]
+                self.__record_fill(o['symbol'], 'market', o['side'], o['amount'], o['price'])
+            elif o['type'] == "limit":
                 h, i = self.__load_history(o['symbol'], self.__interval)
-                price = h.iloc[i]
-                if price['Low'] <= o['price'] <= price['High']:
+                if h.values[LOW, i] <= o['price'] <= h.values[HIGH, i]:
                     # Fill all limit orders of which price is between low and high of the last record
                     o['status'] = "filled"
-
-        # Update current time
-        self.__current_time = int(next_time.timestamp() * 1000)
+                    del self.__open_orders[o['id']]
+                    self.__record_fill(o['symbol'], 'limit', o['side'], o['amount'], o['price'])
+
+    # Fill orders in order of time within the last k-line
+    # Market orders are filled at its open, limit orders at the first 1m k-line touching their price
+    # Orders are stamped with their fill time (orders filled at the same time keep the order of creation)
+    def __fill_orders_intrabar(self):
+        fills = []
+        for o in self.__open_orders.values():
+            h, i = self.__load_history(o['symbol'], self.__interval)
+            if o['type'] == "market":
+                fills.append((int(h.timestamp[i]), o))
+            elif o['type'] == "limit":
+                t = self.__touched_intrabar(o['symbol'], o['price'], h, i)
+                if t is not None:
+                    fills.append((t, o))
+
+        # Stable sort keeps the order of creation
+        fills.sort(key=lambda f: f[0])
+        for t, o in fills:
+            o['status'] = "filled"
+            o['timestamp'] = t
+            del self.__open_orders[o['id']]
+            self.__record_fill(o['symbol'], o['type'], o['side'], o['amount'], o['price'], t)
+
+    # Record a fill (in the current k-line by default)
+    def __record_fill(self, symbol: str, type: str, side: str, amount: float, price: float, timestamp: int = None):
+        fee = self.__taker_fee if type == 'market' else self.__maker_fee
+        signed = amount if side == 'buy' else -amount
+        self.__fills.append((self.__current_time if timestamp is None else timestamp, symbol, signed,
+                             -signed * price - price * amount * fee / 100))
+
+    # Timestamp of the first 1m k-line within the i-th k-line of which low and high cover price (None if not touched)
+    # 1m history is loaded only when needed (by the first open order)
+    def __touched_intrabar(self, symbol: str, price: float, h: history.History, i: int):
+        sub = self.__get_history(symbol, history.RESAMPLE_BASE)
+        start = int(h.timestamp[i])
+        end = start + parse_timeframe(self.__interval) * 1000
+        a = int(np.searchsorted(sub.timestamp, start, side='left'))
+        b = int(np.searchsorted(sub.timestamp, end, side='left'))
+        if a == b:
+            # No 1m k-lines, use the k-line itself
+            return start if h.values[LOW, i] <= price <= h.values[HIGH, i] else None
+        touched = (sub.values[LOW, a:b] <= price) & (price <= sub.values[HIGH, a:b])
+        k = int(np.argmax(touched))
+        return int(sub.timestamp[a + k]) if touched[k] else None
 
     # Return limited history before current time with duplicated latest time
     # Real bot will return limited history before and including current time
-    # TODO symbol and timeframe
-    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = 500, duplicate=True) -> dict:
+    # Columnar history (OHLCV) is a view of the loaded history without copying
+    # Timeframes without stored data are resampled from 1m data
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = 500, duplicate=True, columnar=False):
         # Load history
         h, i = self.__load_history(symbol, timeframe)
+        start = max(i - limit, 0)
 
-        # From dataframe to list
-        h = h.iloc[i - limit: i].values.tolist()
+        if columnar:
+            # Duplicate last record by flag (the first record is dropped to keep the limit)
+            if duplicate and start < i:
+                start += 1
+            return OHLCV(h.timestamp[start:i], h.values[:, start:i], duplicate)
 
-        # Duplicate last record (due to the unfinished k-line data in real)
-        if duplicate:
-            h.append(h[-1])
-            h = h[1:]
+        # From history to list
+        rec = h.records(start, i)
 
-        # Integer timestamp
-        for r in h:
-            r[0] = int(r[0])
-        return h
+        # Duplicate last record (due to the unfinished k-line data in real)
+        if duplicate and len(rec) > 0:
+            rec.append(rec[-1])
+            rec = rec[1:]
+        return rec
 
     def get_ticker(self, symbol: str) -> dict:
         # Load history
         h, i = self.__load_history(symbol, self.__interval)
         return dict(
             symbol=symbol,
-            last=h.iloc[i]['Open'],
+            last=h.values[OPEN, i],
             timestamp=self.__current_time
         )
 
-    def buy_limit(self, symbol: str, amount: float, price: float) -> Order:
-        o = Order(self.__order_id, symbol, 'limit', 'buy', amount, price, self.__current_time)
-        self.__order_history.append(o)
-        self.__order_id += 1
-        return o
+    def buy_limit(self, symbol: str, amount: float, price: float) -> OrderView:
+        return self.__add_order(symbol, 'limit', 'buy', amount, price)
 
-    def buy_market(self, symbol: str, amount: float) -> Order:
+    def buy_market(self, symbol: str, amount: float) -> OrderView:
         # Load history
         h, i = self.__load_history(symbol, self.__interval)
 
         # Assume market price is close to the open price of the next record
         # TODO Check whether balance is enough to buy
-        o = Order(self.__order_id, symbol, 'market', 'buy', amount, h.iloc[i]['Open'],
-                  self.__current_time)
-        self.__order_history.append(o)
-        self.__order_id += 1
-        return o
+        return self.__add_order(symbol, 'market', 'buy', amount, h.values[OPEN, i])
 
     # Buy (Good till crossing / Post only) same with buy limit for backtesting
-    def buy_gtx(self, symbol: str, amount: float, price: float) -> Order:
+    def buy_gtx(self, symbol: str, amount: float, price: float) -> OrderView:
         return self.buy_limit(symbol, amount, price)
 
-    def sell_limit(self, symbol: str, amount: float, price: float) -> Order:
-        o = Order(self.__order_id, symbol, 'limit', 'sell', amount, price, self.__current_time)
-        self.__order_history.append(o)
-        self.__order_id += 1
-        return o
+    def sell_limit(self, symbol: str, amount: float, price: float) -> OrderView:
+        return self.__add_order(symbol, 'limit', 'sell', amount, price)
 
-    def sell_market(self, symbol: str, amount: float) -> Order:
+    def sell_market(self, symbol: str, amount: float) -> OrderView:
         # Load history
         h, i = self.__load_history(symbol, self.__interval)
         # TODO Check whether amount is enough to sell
-        o = Order(self.__order_id, symbol, 'market', 'sell', amount, h.iloc[i]['Open'],
-                  self.__current_time)
-        self.__order_history.append(o)
-        self.__order_id += 1
-        return o
+        return self.__add_order(symbol, 'market', 'sell', amount, h.values[OPEN, i])
 
     # Buy (Good till crossing / Post only) same with sell limit for backtesting
-    def sell_gtx(self, symbol: str, amount: float, price: float) -> Order:
+    def sell_gtx(self, symbol: str, amount: float, price: float) -> OrderView:
         return self.sell_limit(symbol, amount, price)
 
     def get_order(self, o_id: int, symbol: str) -> dict:
-        order = None
-        for o in self.__order_history:
-            if o['id'] == o_id:
-                order = o
-                break
-        return order
+        return self.__order_history[o_id] if 0 <= o_id < len(self.__order_history) else None
 
     def cancel_order(self, o_id: int, symbol: str):
-        for o in self.__order_history:
-            if o['id'] == o_id:
-                o['status'] = "cancel"
-                break
+        o = self.get_order(o_id, symbol)
+        if o is not None:
+            o['status'] = "cancel"
+            self.__open_orders.pop(o_id, None)
 
     def cancel_unfilled_orders(self, symbol: str, limit: int = None):
         canceled_ids = []
-        for o in self.__order_history:
-            if o['status'] == "unfilled":
-                o['status'] = "cancel"
-                canceled_ids.append(o['id'])
+        for o in self.__open_orders.values():
+            o['status'] = "cancel"
+            canceled_ids.append(o['id'])
+        self.__open_orders = {}
         return canceled_ids
 
-    # Return <History, Index of the current time | Index of the assigned timestamp>
-    def __load_history(self, symbol: str, timeframe: str, time: datetime = None):
+    # Register a new (unfilled) order
+    def __add_order(self, symbol: str, type: str, side: str, amount: float, price: float):
+        o = self.__order_history.append(symbol, type, side, amount, price, self.__current_time)
+        self.__open_orders[o['id']] = o
+        return o
+
+    # Vectorized backtesting
+    # The strategy calculates entry and exit signals over the whole history at once (strategy.signals), and signals
+    # of a complete k-line are executed as market orders at the open price of the next k-line in [start, end],
+    # the same timing as running the strategy bar by bar.
+    # Signals are calculated on the interval, so the time frame of the strategy (signals['time_frame']) must match it.
+    def run_signals(self, strategy, start_time: datetime, end_time: datetime):
+        h = self.__get_history(self.__pair, self.__interval)
+        signals = strategy.signals(OHLCV(h.timestamp, h.values))
+        if signals.get('time_frame', self.__interval) != self.__interval:
+            raise Exception(f'Vectorized backtesting needs interval {signals["time_frame"]} '
+                            f'(time frame of the strategy), got {self.__interval}.')
+        legs = signals['legs']
+        max_open_order = signals.get('max_open_order', 1)
+
+        # Execution k-lines [first, last)
+        first = max(int(np.searchsorted(h.timestamp, int(start_time.timestamp() * 1000), side='left')), 1)
+        last = int(np.searchsorted(h.timestamp, int(end_time.timestamp() * 1000), side='right'))
+
+        entries = [np.asarray(leg['entry'], dtype=bool)[first - 1:last - 1] for leg in legs]
+        exits = [np.asarray(leg['exit'], dtype=bool)[first - 1:last - 1] for leg in legs]
+        events = np.zeros(max(last - first, 0), dtype=bool)
+        for en, ex in zip(entries, exits):
+            events |= en | ex
+
+        # Only k-lines with any signal are visited
+        open_amounts = [[] for _ in legs]
+        for k in np.flatnonzero(events).tolist():
+            i = first + k
+            self.__current_time = int(h.timestamp[i])
+            price = h.values[OPEN, i]
+            for leg, en, ex, amounts in zip(legs, entries, exits, open_amounts):
+                if en[k]:
+                    # Check whether reached max number of open orders
+                    if sum(len(a) for a in open_amounts) < max_open_order:
+                        self.__add_filled_order(leg['symbol'], 'buy', leg['amount'], price)
+                        amounts.append(leg['amount'])
+                elif ex[k] and len(amounts) > 0:
+                    # Close all open orders of the leg
+                    for amount in amounts:
+                        self.__add_filled_order(leg['symbol'], 'sell', amount, price)
+                    amounts.clear()
+
+    def __add_filled_order(self, symbol: str, side: str, amount: float, price: float):
+        self.__order_history.append(symbol, 'market', side, amount, price, self.__current_time, "filled")
+        self.__record_fill(symbol, 'market', side, amount, price)
+
+    # Use preloaded history (e.g. shared among backtesting processes)
+    def set_history(self, symbol: str, timeframe: str, h: history.History):
+        self.__history[symbol + timeframe] = h
+
+    def __get_history(self, symbol: str, timeframe: str) -> history.History:
         key = symbol + timeframe
         if key not in self.__history.keys():
-            self.__history[key] = pd.read_csv(f'{self.__data_dir}{symbol.replace("/", "")}_{timeframe}.csv')
+            # Cache loaded (or resampled) history
+            self.__history[key] = history.load_timeframe(self.__data_dir, symbol, timeframe)
 
         h = self.__history[key]
         assert len(h) > 0, 'Lack backtesting data.'
+        return h
+
+    # Return <History, Index of the current time | Index of the assigned timestamp>
+    def __load_history(self, symbol: str, timeframe: str, time: datetime = None):
+        h = self.__get_history(symbol, timeframe)
 
-        timestamp = self.__current_time if time is None else int(time.timestamp() * 1000)
-        i = h.index[h['Timestamp'] <= timestamp].tolist()
-        assert len(i) >= 1, 'Backtesting data corrupted.'
-        return h, i[-1]
+        if time is None and timeframe == self.__interval and symbol in self.__timeline_index and \
+                self.__step is not None:
+            # Aligned on the timeline
+            i = int(self.__timeline_index[symbol][self.__step])
+        else:
+            timestamp = self.__current_time if time is None else int(time.timestamp() * 1000)
+            i = h.locate(timestamp)
+        assert i >= 0, 'Backtesting data corrupted.'
+        return h, i
 
     def create_order_record(self, name: str, order):
         if name in self.__order_record.keys():
@@ -208,25 +370,27 @@ class BackTestBot(object):
             self.__order_record[name] = []
 
     def create_setting(self, setting):
-        self.__setting = setting
+        self.__setting = {**setting, **{k: v for k, v in self.__setting_override.items() if k in setting}}
 
     def get_setting(self):
         return self.__setting
 
+    def get_order_history(self) -> OrderStore:
+        return self.__order_history
+
     def output_order_history(self, result_dir: str, status: str = None):
         print('Order history')
-        orders = []
-        if status is None:
-            for o in self.__order_history:
-                # logging.info(o)
-                orders.append([o['timestamp'], o['side'], o['amount'], o['symbol']])
-        else:
+        store = self.__order_history
+        selected = np.ones(len(store), dtype=bool)
+        if status is not None:
             # Output orders with specific status
-            for o in self.__order_history:
-                if o['status'] == status:
-                    # logging.info(
-                    #     f"{datetime.fromtimestamp(o['timestamp'] / 1000)} {o['side']} ({o['amount']}) at {o['price']}")
-                    orders.append([o['timestamp'], o['side'], o['amount'], o['symbol']])
+            selected = store.column('status') == store.code('status', status)
+
+        sides = store.values('side')
+        symbols = store.values('symbol')
+        orders = [[t, sides[side], amount, symbols[symbol]] for t, side, amount, symbol in zip(
+            store.column('timestamp')[selected].tolist(), store.column('side')[selected].tolist(),
+            store.column('amount')[selected].tolist(), store.column('symbol')[selected].tolist())]
 
         path = result_dir + self.__raw_subdir
         if not os.path.isdir(path):
@@ -234,34 +398,89 @@ class BackTestBot(object):
         with open(f'{path}order_history.json', 'w') as outfile:
             json.dump(orders, outfile)
 
-    def output_performance(self, result_dir: str, start_time: datetime, end_time: datetime):
+    # Calculate performance model with buy & hold of the pairs (balance split equally)
+    def get_performance(self, start_time: datetime, end_time: datetime) -> PerfInfo:
+        orders = self.__order_history
+        if self.__intrabar:
+            # Intrabar fills are stamped with their fill time, evaluate them in order of time (stable)
+            orders = sorted(orders, key=lambda o: o['timestamp'])
+        perf = get_performance(orders, self.__taker_fee, self.__maker_fee)
+
+        balance = self.__balance / len(self.__pairs)
+        for pair in self.__pairs:
+            start_price = self.__entry_price(pair, start_time)
+            h, i = self.__load_history(pair, self.__interval, end_time)
+            end_price = h.values[OPEN, i]
+
+            buy_hold = balance / start_price * end_price - balance
+            perf.buy_hold += buy_hold
+            perf.symbol_perf.setdefault(pair, {})['buy_hold'] = buy_hold
+
+        # Risk metrics from the equity curve
+        timestamp, equity, _, exposed = self.get_equity(start_time, end_time)
+        get_equity_perf(perf, timestamp, equity, exposed, parse_timeframe(self.__interval))
+        return perf
+
+    # Mark-to-market equity (balance, realized and unrealized PnL, fees) at the close of each k-line on the timeline
+    # Return <timestamps, equity, Buy & Hold equity of the pairs (balance split equally), whether any position is open>
+    # Cached until the next fill (performance and output use the same curve)
+    def get_equity(self, start_time: datetime, end_time: datetime):
+        key = (start_time, end_time, len(self.__fills))
+        if self.__equity is None or self.__equity[0] != key:
+            self.__equity = (key, self.__compute_equity(start_time, end_time))
+        return self.__equity[1]
+
+    def __compute_equity(self, start_time: datetime, end_time: datetime):
+        timeline = self.__timeline if self.__timeline is not None else self.build_timeline(start_time, end_time)
+        n = len(timeline)
+        equity = np.full(n, float(self.__balance))
+        buy_hold = np.zeros(n)
+        exposed = np.zeros(n, dtype=bool)
+        if n == 0:
+            return timeline, equity, buy_hold, exposed
+
+        if len(self.__fills) > 0:
+            times, symbols, amounts, cash = zip(*self.__fills)
+            # K-line of each fill on the timeline
+            k = np.maximum(np.searchsorted(timeline, np.array(times, dtype=np.int64), side='right') - 1, 0)
+            amounts = np.array(amounts, dtype=np.float64)
+            symbols = np.array(symbols, dtype=object)
+            equity += np.cumsum(np.bincount(k, weights=np.array(cash, dtype=np.float64), minlength=n))
+
+            for symbol in dict.fromkeys(symbols.tolist()):
+                selected = symbols == symbol
+                position = np.cumsum(np.bincount(k[selected], weights=amounts[selected], minlength=n))
+                equity += position * self.__timeline_close(symbol, timeline)
+                exposed |= np.abs(position) > 10 ** -10
+
+        balance = self.__balance / len(self.__pairs)
+        for pair in self.__pairs:
+            start_price = self.__entry_price(pair, start_time)
+            buy_hold += balance / start_price * self.__timeline_close(pair, timeline, start_price)
+        return timeline, equity, buy_hold, exposed
+
+    # Buy & Hold entry price of the symbol: open of its first record at or after start time (pairs may start later)
+    def __entry_price(self, symbol: str, start_time: datetime) -> float:
+        h = self.__get_history(symbol, self.__interval)
+        i = int(np.searchsorted(h.timestamp, int(start_time.timestamp() * 1000), side='left'))
+        assert i < len(h), 'Lack backtesting data.'
+        return h.values[OPEN, i]
+
+    # Close price of the symbol at each timestamp of the timeline (default before its first record)
+    def __timeline_close(self, symbol: str, timeline: np.ndarray, default: float = 0) -> np.ndarray:
+        h = self.__get_history(symbol, self.__interval)
+        if symbol in self.__timeline_index:
+            index = self.__timeline_index[symbol]
+        else:
+            index = np.searchsorted(h.timestamp, timeline, side='right') - 1
+        return np.where(index >= 0, h.values[CLOSE, np.maximum(index, 0)], default)
+
+    # Output performance information and raw PnL information (rendered to figures now or later by render.py)
+    def output_performance(self, result_dir: str, start_time: datetime, end_time: datetime, render: bool = True):
         print(f'Output performance to {result_dir}')
 
         # Calculate performance model
-        perf = get_performance(self.__order_history, self.__taker_fee, self.__maker_fee)
-
-        # Plot PnL figures
-        fig, (ax1, ax2) = plt.subplots(2)
-        fig.suptitle('PnL Figures')
-        # Plot PnL history
-        pnl_timestamps = [r[0] for r in perf.pnl_history]
-        pnl_history = [r[1] for r in perf.pnl_history]
-        ax1.plot(pd.to_datetime(pnl_timestamps, unit='ms'), pnl_history)
-        ax1.set_title("PnL")
-        ax1.set_xlabel("Time")
-        ax1.tick_params(axis='x', rotation=45)
-        ax1.set_ylabel("PnL")
-        # Plot cumulative PnL history
-        cum_pnl_timestamps = [r[0] for r in perf.cum_pnl_history]
-        cum_pnl_history = [r[1] for r in perf.cum_pnl_history]
-        ax2.plot(pd.to_datetime(cum_pnl_timestamps, unit='ms'), cum_pnl_history)
-        ax2.set_title("Cummulative PnL")
-        ax2.set_xlabel("Time")
-        ax2.tick_params(axis='x', rotation=45)
-        ax2.set_ylabel("Cum PnL")
-
-        plt.tight_layout()
-        plt.savefig(f'{result_dir}pnl_history.svg')
+        perf = self.get_performance(start_time, end_time)
 
         # Output PnL information
         path = result_dir + self.__raw_subdir
@@ -273,43 +492,40 @@ class BackTestBot(object):
         with open(f'{path}cum_pnl.json', 'w') as outfile:
             json.dump(perf.cum_pnl_history, outfile)
 
+        # Output equity curve <timestamp, equity, Buy & Hold equity>
+        timestamp, equity, buy_hold, _ = self.get_equity(start_time, end_time)
+        with open(f'{path}equity.json', 'w') as outfile:
+            json.dump(list(map(list, zip(timestamp.tolist(), equity.tolist(), buy_hold.tolist()))), outfile)
+
+        # Plot PnL figures
+        if render:
+            plot_pnl(perf.pnl_history, perf.cum_pnl_history, f'{result_dir}pnl_history.svg')
+
         delattr(perf, 'pnl_history')
         delattr(perf, 'cum_pnl_history')
 
         # Output performance information
-        h, i = self.__load_history(self.__pair, self.__interval, start_time)
-        start_price = h.iloc[i]['Open']
-        h, i = self.__load_history(self.__pair, self.__interval, end_time)
-        end_price = h.iloc[i]['Open']
-
-        perf.buy_hold = self.__balance / start_price * end_price - self.__balance
-
         print(perf.__dict__)
 
         # Store performance information
         with open(f'{result_dir}performance.json', 'w') as outfile:
             json.dump(perf.__dict__, outfile, indent=4)
 
-    def output_view(self, result_dir: str, global_dir: str, plot):
+    # Output visualization of the backtesting range (with margin)
+    # K-lines are downsampled for the overview, full resolution chunks are shared in the global directory
+    def output_view(self, result_dir: str, global_dir: str, plot, start_time: datetime, end_time: datetime):
         data_name = self.__pair.replace("/", "") + "_" + self.__interval
 
-        k_line = []
-        with open(f'{self.__data_dir}{data_name}.csv') as k_data_file:
-            csv_reader = csv.reader(k_data_file)
-            header = next(csv_reader)
-            if header is not None:
-                for row in csv_reader:
-                    k_line.append(row)
-
-        k_line = "const K_LINE_DATA = " + json.dumps(k_line)
-        with open(f'{global_dir}{data_name}.js', 'w') as k_line_file:
-            k_line_file.write(k_line)
-
         raw_path = result_dir + self.__raw_subdir
         script_path = result_dir + self.__script_subdir
         if not os.path.isdir(script_path):
             os.mkdir(script_path)
 
+        h = self.__get_history(self.__pair, self.__interval)
+        a, b = view.window(h, int(start_time.timestamp() * 1000), int(end_time.timestamp() * 1000))
+        view.write_k_line(h, self.__interval, a, b, f'{script_path}k_line.js', f'{global_dir}{data_name}/',
+                          f'../global/{data_name}/')
+
         # Create scripts
         with open(f'{raw_path}order_history.json') as orders_file:
             order_history = json.load(orders_file)
@@ -336,7 +552,7 @@ class BackTestBot(object):
         # Create HTML
         with open('view/index.html') as template:
             t = template.read()
-            t = t.replace("{!k_line!}", f'../global/{data_name}.js') \
+            t = t.replace("{!k_line!}", f'{self.__script_subdir}k_line.js') \
                 .replace("{!order_history!}", f'{self.__script_subdir}order_history.js') \
                 .replace("{!pnl!}", f'{self.__script_subdir}pnl.js') \
                 .replace("{!cum_pnl!}", f'{self.__script_subdir}cum_pnl.js') \
@@ -353,6 +569,7 @@ class BackTestBot(object):
             'interval': config['interval'],
             'balance': config['balance'],
             'pair': config['pair'],
+            'pairs': self.__pairs,
             'taker_fee': config['taker_fee'],
             'maker_fee': config['maker_fee']
         }
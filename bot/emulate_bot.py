@@ -1,13 +1,16 @@
 import json
 import logging
 import os
+import threading
 
 import ccxt
 from tenacity import *
 
-from core.model import Order
+from core.model import Order, to_ohlcv
 from core.order_manager import OrderManager
-from core.performance import get_performance
+from core.sqlite_store import SQLiteStore
+from core.util import write_atomic
+from core.performance import PerfAccumulator
 
 
 # Real-time Emulator
@@ -54,34 +57,52 @@ class EmulateBot(object):
         # Runtime setting path
         self.__setting_path = f'{config["runtime_dir"]}setting.json'
 
-        if not os.path.exists(self.__info_path):
-            # Create info file
-            with open(self.__info_path, 'w') as outfile:
-                info = {}
-                json.dump(info, outfile)
+        # Lock of runtime JSON files (read-modify-write by jobs of different schedulers)
+        self.__state_lock = threading.Lock()
+
+        # Runtime state in SQLite instead of JSON files
+        self.__store = None
+        if config.get('state', 'json') == 'sqlite':
+            db_path = f'{config["runtime_dir"]}runtime.db'
+            new = not os.path.exists(db_path)
+            self.__store = SQLiteStore(db_path)
+            if new:
+                # Continue from JSON files of earlier runs
+                self.__store.import_json(self.__orders_path, self.__info_path, self.__setting_path)
+
+            # Order manager
+            self.om = self.__store
+        else:
+            if not os.path.exists(self.__info_path):
+                # Create info file
+                write_atomic(self.__info_path, json.dumps({}))
 
-        if not os.path.exists(self.__orders_path):
-            # Create order record file
-            with open(self.__orders_path, 'w') as outfile:
-                order = {}
-                json.dump(order, outfile)
+            if not os.path.exists(self.__orders_path):
+                # Create order record file
+                write_atomic(self.__orders_path, json.dumps({}))
 
-        # Order manager
-        self.om = OrderManager(self.__orders_path)
+            # Order manager
+            self.om = OrderManager(self.__orders_path)
 
         # Track complete order history
         self.__order_history = []
 
+        # Performance of filled orders (market orders are filled when created in emulation)
+        self.__perf = PerfAccumulator(config.get('taker_fee', 0.04), config.get('maker_fee', 0.02))
+
         # Order ID Issuer
         self.__order_id = 0
 
+        # Lock of order ID, order history and performance (orders are made by strategy and trigger jobs)
+        self.__order_lock = threading.Lock()
+
         logging.info("Emulate bot created.")
 
     @retry(stop=stop_after_attempt(5), wait=wait_random(min=1, max=2),
            after=after_log(logging.getLogger(__name__), logging.ERROR))
-    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = None, duplicate=None) -> dict:
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = None, duplicate=None, columnar=False):
         rec = self.__fetch_ohlcv(symbol, timeframe, limit)
-        return rec
+        return to_ohlcv(rec) if columnar else rec
 
     # TODO No use
     def get_ohlcv_range(self, symbol: str, timeframe: str, start: int, end: int) -> dict:
@@ -127,17 +148,21 @@ class EmulateBot(object):
     #     return orders
 
     def buy_limit(self, symbol: str, amount: float, price: float) -> Order:
-        o = Order(self.__order_id, symbol, 'limit', 'buy', amount, price)
-        self.__order_history.append(o)
-        self.__order_id += 1
+        with self.__order_lock:
+            o = Order(self.__order_id, symbol, 'limit', 'buy', amount, price)
+            self.__order_history.append(o)
+            self.__order_id += 1
         logging.info('buy (' + str(amount) + ') at (' + str(price) + ')')
         return o
 
     def buy_market(self, symbol: str, amount: float) -> Order:
         ticker = self.exchange.fetch_ticker(symbol)
-        o = Order(self.__order_id, symbol, 'market', 'buy', amount, ticker['last'])
-        self.__order_history.append(o)
-        self.__order_id += 1
+        with self.__order_lock:
+            o = Order(self.__order_id, symbol, 'market', 'buy', amount, ticker['last'], ticker['timestamp'],
+                      "filled")
+            self.__order_history.append(o)
+            self.__perf.add(o)
+            self.__order_id += 1
         logging.info('buy (' + str(amount) + ') at (' + str(ticker['last']) + ')')
         return o
 
@@ -146,17 +171,21 @@ class EmulateBot(object):
         return self.buy_limit(symbol, amount, price)
 
     def sell_limit(self, symbol: str, amount: float, price: float) -> Order:
-        o = Order(self.__order_id, symbol, 'limit', 'sell', amount, price)
-        self.__order_history.append(o)
-        self.__order_id += 1
+        with self.__order_lock:
+            o = Order(self.__order_id, symbol, 'limit', 'sell', amount, price)
+            self.__order_history.append(o)
+            self.__order_id += 1
         logging.info('sell (' + str(amount) + ') at (' + str(price) + ')')
         return o
 
     def sell_market(self, symbol: str, amount: float) -> Order:
         ticker = self.exchange.fetch_ticker(symbol)
-        o = Order(self.__order_id, symbol, 'market', 'sell', amount, ticker['last'])
-        self.__order_history.append(o)
-        self.__order_id += 1
+        with self.__order_lock:
+            o = Order(self.__order_id, symbol, 'market', 'sell', amount, ticker['last'], ticker['timestamp'],
+                      "filled")
+            self.__order_history.append(o)
+            self.__perf.add(o)
+            self.__order_id += 1
         logging.info('sell (' + str(amount) + ') at (' + str(ticker['last']) + ')')
         return o
 
@@ -176,30 +205,35 @@ class EmulateBot(object):
         return
 
     def output_performance(self):
-        perf = get_performance(self.__order_history)
+        with self.__order_lock:
+            perf = self.__perf.snapshot()
         perf = json.dumps(perf.__dict__)
         logging.info(perf)
 
     def output_balance(self):
         balance = self.get_balance()
         if balance is not None:
-            with open(self.__info_path) as info_file:
-                info = json.load(info_file)
-                info['balance'] = {
-                    'totalWalletBalance': balance['totalWalletBalance'],
-                    'totalUnrealizedProfit': balance['totalUnrealizedProfit'],
-                    'totalMarginBalance': balance['totalMarginBalance'],
-                    'totalInitialMargin': balance['totalInitialMargin'],
-                    'totalMaintMargin': balance['totalMaintMargin'],
-                    'totalPositionInitialMargin': balance['totalPositionInitialMargin'],
-                    'totalOpenOrderInitialMargin': balance['totalOpenOrderInitialMargin'],
-                    'totalCrossWalletBalance': balance['totalCrossWalletBalance'],
-                    'totalCrossUnPnl': balance['totalCrossUnPnl'],
-                    'availableBalance': balance['availableBalance']
-                }
-                with open(self.__info_path, 'w') as outfile:
-                    json.dump(info, outfile)
-                logging.info(json.dumps(info['balance']))
+            balance = {
+                'totalWalletBalance': balance['totalWalletBalance'],
+                'totalUnrealizedProfit': balance['totalUnrealizedProfit'],
+                'totalMarginBalance': balance['totalMarginBalance'],
+                'totalInitialMargin': balance['totalInitialMargin'],
+                'totalMaintMargin': balance['totalMaintMargin'],
+                'totalPositionInitialMargin': balance['totalPositionInitialMargin'],
+                'totalOpenOrderInitialMargin': balance['totalOpenOrderInitialMargin'],
+                'totalCrossWalletBalance': balance['totalCrossWalletBalance'],
+                'totalCrossUnPnl': balance['totalCrossUnPnl'],
+                'availableBalance': balance['availableBalance']
+            }
+            if self.__store is not None:
+                self.__store.update_state('info', {'balance': balance})
+            else:
+                with self.__state_lock:
+                    with open(self.__info_path) as info_file:
+                        info = json.load(info_file)
+                    info['balance'] = balance
+                    write_atomic(self.__info_path, json.dumps(info))
+            logging.info(json.dumps(balance))
         else:
             logging.info('Cannot fetch balance due to exceptions.')
 
@@ -239,12 +273,18 @@ class EmulateBot(object):
         self.om.clear(name)
 
     def create_setting(self, setting):
-        if not os.path.exists(self.__setting_path):
-            # Create setting file
-            with open(self.__setting_path, 'w') as outfile:
-                json.dump(setting, outfile)
+        if self.__store is not None:
+            if self.__store.get_state('setting') is None:
+                self.__store.set_state('setting', setting)
+        else:
+            with self.__state_lock:
+                if not os.path.exists(self.__setting_path):
+                    # Create setting file
+                    write_atomic(self.__setting_path, json.dumps(setting))
 
     def get_setting(self):
+        if self.__store is not None:
+            return self.__store.get_state('setting')
         with open(self.__setting_path) as setting_file:
             setting = json.load(setting_file)
         return setting
@@ -1,11 +1,15 @@
 import json
 import logging
 import os
+import threading
 
 import ccxt
 from tenacity import *
 
+from core.model import to_ohlcv
 from core.order_manager import OrderManager
+from core.sqlite_store import SQLiteStore
+from core.util import write_atomic
 
 
 # Real-Trading Bot
@@ -52,26 +56,38 @@ class RealBot(object):
         # Runtime setting path
         self.__setting_path = f'{config["runtime_dir"]}setting.json'
 
-        if not os.path.exists(self.__info_path):
-            # Create info file
-            with open(self.__info_path, 'w') as outfile:
-                info = {}
-                json.dump(info, outfile)
+        # Lock of runtime JSON files (read-modify-write by jobs of different schedulers)
+        self.__state_lock = threading.Lock()
+
+        # Runtime state in SQLite instead of JSON files
+        self.__store = None
+        if config.get('state', 'json') == 'sqlite':
+            db_path = f'{config["runtime_dir"]}runtime.db'
+            new = not os.path.exists(db_path)
+            self.__store = SQLiteStore(db_path)
+            if new:
+                # Continue from JSON files of earlier runs
+                self.__store.import_json(self.__orders_path, self.__info_path, self.__setting_path)
+
+            # Order manager
+            self.om = self.__store
+        else:
+            if not os.path.exists(self.__info_path):
+                # Create info file
+                write_atomic(self.__info_path, json.dumps({}))
 
-        if not os.path.exists(self.__orders_path):
-            # Create order record file
-            with open(self.__orders_path, 'w') as outfile:
-                order = {}
-                json.dump(order, outfile)
+            if not os.path.exists(self.__orders_path):
+                # Create order record file
+                write_atomic(self.__orders_path, json.dumps({}))
 
-        # Order manager
-        self.om = OrderManager(self.__orders_path)
+            # Order manager
+            self.om = OrderManager(self.__orders_path)
 
         logging.info("REAL Bot created.")
 
-    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = None, duplicate=None) -> dict:
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = None, duplicate=None, columnar=False):
         rec = self.__fetch_ohlcv(symbol, timeframe, limit)
-        return rec
+        return to_ohlcv(rec) if columnar else rec
 
     # TODO No use
     def get_ohlcv_range(self, symbol: str, timeframe: str, start: int, end: int) -> dict:
@@ -211,22 +227,26 @@ class RealBot(object):
     def output_balance(self):
         balance = self.get_balance()
         if balance is not None:
-            with open(self.__info_path) as info_file:
-                info = json.load(info_file)
-                info['balance'] = {
-                    'totalWalletBalance': balance['totalWalletBalance'],
-                    'totalUnrealizedProfit': balance['totalUnrealizedProfit'],
-                    'totalMarginBalance': balance['totalMarginBalance'],
-                    'totalInitialMargin': balance['totalInitialMargin'],
-                    'totalMaintMargin': balance['totalMaintMargin'],
-                    'totalPositionInitialMargin': balance['totalPositionInitialMargin'],
-                    'totalOpenOrderInitialMargin': balance['totalOpenOrderInitialMargin'],
-                    'totalCrossWalletBalance': balance['totalCrossWalletBalance'],
-                    'totalCrossUnPnl': balance['totalCrossUnPnl'],
-                    'availableBalance': balance['availableBalance']
-                }
-                with open(self.__info_path, 'w') as outfile:
-                    json.dump(info, outfile)
+            balance = {
+                'totalWalletBalance': balance['totalWalletBalance'],
+                'totalUnrealizedProfit': balance['totalUnrealizedProfit'],
+                'totalMarginBalance': balance['totalMarginBalance'],
+                'totalInitialMargin': balance['totalInitialMargin'],
+                'totalMaintMargin': balance['totalMaintMargin'],
+                'totalPositionInitialMargin': balance['totalPositionInitialMargin'],
+                'totalOpenOrderInitialMargin': balance['totalOpenOrderInitialMargin'],
+                'totalCrossWalletBalance': balance['totalCrossWalletBalance'],
+                'totalCrossUnPnl': balance['totalCrossUnPnl'],
+                'availableBalance': balance['availableBalance']
+            }
+            if self.__store is not None:
+                self.__store.update_state('info', {'balance': balance})
+            else:
+                with self.__state_lock:
+                    with open(self.__info_path) as info_file:
+                        info = json.load(info_file)
+                    info['balance'] = balance
+                    write_atomic(self.__info_path, json.dumps(info))
         else:
             logging.info('Cannot fetch balance due to exceptions.')
 
@@ -266,12 +286,18 @@ class RealBot(object):
         self.om.clear(name)
 
     def create_setting(self, setting):
-        if not os.path.exists(self.__setting_path):
-            # Create setting file
-            with open(self.__setting_path, 'w') as outfile:
-                json.dump(setting, outfile)
+        if self.__store is not None:
+            if self.__store.get_state('setting') is None:
+                self.__store.set_state('setting', setting)
+        else:
+            with self.__state_lock:
+                if not os.path.exists(self.__setting_path):
+                    # Create setting file
+                    write_atomic(self.__setting_path, json.dumps(setting))
 
     def get_setting(self):
+        if self.__store is not None:
+            return self.__store.get_state('setting')
         with open(self.__setting_path) as setting_file:
             setting = json.load(setting_file)
         return setting
@@ -0,0 +1,178 @@
+import os
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core.util import parse_timeframe
+
+# Column order of the price buffer
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+# Number of price columns
+OHLC = 4
+
+# Timeframe that coarser timeframes are resampled from when not stored
+RESAMPLE_BASE = '1m'
+
+# Binary format: header <magic, version, number of records>, int64 timestamps, float64 columns (open, high, low,
+# close, volume) one after another, all little-endian
+BINARY_MAGIC = b'CPYOHLCV'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<8sIxxxxq8x')
+
+
+# OHLCV history with a sorted timestamp index
+class History(object):
+
+    def __init__(self, timestamp: np.ndarray, values: np.ndarray):
+        # Sorted timestamps (ms)
+        self.timestamp = timestamp
+
+        # Contiguous price buffer, one row per column (open, high, low, close, volume)
+        self.values = values
+
+        # Index of the last located record (follows the simulation clock)
+        self.__cursor = 0
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    # Return index of the last record at or before timestamp (-1 if none)
+    def locate(self, timestamp: int) -> int:
+        ts = self.timestamp
+        n = len(ts)
+        c = self.__cursor
+
+        # Same or next record of the last lookup (the common case while stepping forward)
+        if n > 0 and ts[c] <= timestamp:
+            if c + 1 == n or timestamp < ts[c + 1]:
+                return c
+            if c + 2 == n or timestamp < ts[c + 2]:
+                self.__cursor = c + 1
+                return c + 1
+
+        # Binary search otherwise
+        i = int(np.searchsorted(ts, timestamp, side='right')) - 1
+        if i >= 0:
+            self.__cursor = i
+        return i
+
+    # Records in [start, end) as a list of [timestamp, open, high, low, close, volume]
+    def records(self, start: int, end: int) -> list:
+        return [[t] + r for t, r in zip(self.timestamp[start:end].tolist(), self.values[:, start:end].T.tolist())]
+
+
+def from_frame(frame: pd.DataFrame) -> History:
+    # Records must be in time order for binary search
+    if not frame['Timestamp'].is_monotonic_increasing:
+        frame = frame.sort_values('Timestamp', ignore_index=True)
+
+    timestamp = frame['Timestamp'].values.astype(np.int64)
+    values = np.ascontiguousarray(frame[['Open', 'High', 'Low', 'Close', 'Volume']].values.T, dtype=np.float64)
+    return History(timestamp, values)
+
+
+def read_csv(path: str) -> History:
+    return from_frame(pd.read_csv(path))
+
+
+# Memory-map history in binary format (read-only, no parsing)
+def read_binary(path: str) -> History:
+    with open(path, 'rb') as f:
+        magic, version, length = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise Exception(f'{path} is not a supported OHLCV binary file.')
+
+    if length == 0:
+        return History(np.zeros(0, dtype=np.int64), np.zeros((5, 0), dtype=np.float64))
+    offset = BINARY_HEADER.size
+    timestamp = np.memmap(path, dtype='<i8', mode='r', offset=offset, shape=(length,))
+    values = np.memmap(path, dtype='<f8', mode='r', offset=offset + timestamp.nbytes, shape=(5, length))
+    return History(timestamp, values)
+
+
+def write_binary(path: str, h: History):
+    # Write to a temporary file first so that readers never map a partial file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(h)))
+        f.write(np.ascontiguousarray(h.timestamp, dtype='<i8').tobytes())
+        f.write(np.ascontiguousarray(h.values, dtype='<f8').tobytes())
+    os.replace(tmp_path, path)
+
+
+# Data file path without extension
+def data_path(data_dir: str, symbol: str, timeframe: str) -> str:
+    return f'{data_dir}{symbol.replace("/", "")}_{timeframe}'
+
+
+# Load history, preferring the binary file unless the CSV file is newer
+def load(path: str) -> History:
+    binary_path = path + '.bin'
+    csv_path = path + '.csv'
+    if os.path.exists(binary_path) and (
+            not os.path.exists(csv_path) or os.path.getmtime(binary_path) >= os.path.getmtime(csv_path)):
+        return read_binary(binary_path)
+    return read_csv(csv_path)
+
+
+# Load history of the timeframe, resampled from the base timeframe if not stored
+def load_timeframe(data_dir: str, symbol: str, timeframe: str) -> History:
+    path = data_path(data_dir, symbol, timeframe)
+    if os.path.exists(path + '.bin') or os.path.exists(path + '.csv') or timeframe == RESAMPLE_BASE:
+        return load(path)
+    return resample(load(data_path(data_dir, symbol, RESAMPLE_BASE)), timeframe)
+
+
+# Aggregate history into a coarser timeframe
+# K-lines are aligned to multiples of the timeframe since epoch (UTC), the last one may be incomplete
+def resample(h: History, timeframe: str) -> History:
+    period = parse_timeframe(timeframe) * 1000
+    if len(h) == 0:
+        return History(np.zeros(0, dtype=np.int64), np.zeros((5, 0), dtype=np.float64))
+
+    bucket = np.asarray(h.timestamp) // period * period
+    # First record of each k-line
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(h)] - 1
+
+    values = np.empty((5, len(starts)), dtype=np.float64)
+    values[OPEN] = h.values[OPEN, starts]
+    values[HIGH] = np.maximum.reduceat(h.values[HIGH], starts)
+    values[LOW] = np.minimum.reduceat(h.values[LOW], starts)
+    values[CLOSE] = h.values[CLOSE, ends]
+    values[VOLUME] = np.add.reduceat(h.values[VOLUME], starts)
+    return History(bucket[starts], values)
+
+
+# Convert a CSV file to binary format (next to it), return the binary file path
+def convert(csv_path: str) -> str:
+    binary_path = os.path.splitext(csv_path)[0] + '.bin'
+    write_binary(binary_path, read_csv(csv_path))
+    return binary_path
+
+
+# Copy history into shared memory
+# Return <SharedMemory (keep it open while in use and unlink it when done), descriptor for attach>
+def share(h: History):
+    size = h.timestamp.nbytes + h.values.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    timestamp, values = _views(shm, len(h))
+    timestamp[:] = h.timestamp
+    values[:] = h.values
+    return shm, dict(name=shm.name, length=len(h))
+
+
+# Attach to history shared by another process (no copy)
+# Return <SharedMemory (keep it open while in use), History>
+def attach(descriptor: dict):
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    timestamp, values = _views(shm, descriptor['length'])
+    return shm, History(timestamp, values)
+
+
+def _views(shm, length: int):
+    timestamp = np.ndarray((length,), dtype=np.int64, buffer=shm.buf)
+    values = np.ndarray((5, length), dtype=np.float64, buffer=shm.buf, offset=timestamp.nbytes)
+    return timestamp, values
@@ -0,0 +1,204 @@
+import math
+from collections import deque
+
+# Incremental (streaming) indicators
+# Each indicator is updated with one complete k-line at a time in O(1) and follows the TA-Lib definitions,
+# so feeding the whole series gives the same values as the corresponding TA-Lib function.
+# The value is NaN until enough records have been fed (same as the TA-Lib lookback).
+
+nan = float('nan')
+
+
+# Simple Moving Average (TA-Lib SMA)
+class SMA(object):
+
+    def __init__(self, period: int):
+        self.period = period
+        self.value = nan
+        self.__window = deque()
+        self.__total = 0.0
+
+    def update(self, x: float) -> float:
+        self.__window.append(x)
+        self.__total += x
+        if len(self.__window) == self.period:
+            self.value = self.__total / self.period
+            self.__total -= self.__window.popleft()
+        return self.value
+
+    def seed(self, series) -> float:
+        for x in series:
+            self.update(x)
+        return self.value
+
+
+# Exponential Moving Average (TA-Lib EMA, seeded with the SMA of the first period records)
+class EMA(object):
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value = nan
+        self.__count = 0
+        self.__total = 0.0
+
+    def update(self, x: float) -> float:
+        if self.__count < self.period:
+            self.__count += 1
+            self.__total += x
+            if self.__count == self.period:
+                self.value = self.__total / self.period
+        else:
+            self.value = (x - self.value) * self.k + self.value
+        return self.value
+
+    # Start from a given moving average (used by MACD to align the fast EMA)
+    def start(self, value: float):
+        self.__count = self.period
+        self.value = value
+
+    def seed(self, series) -> float:
+        for x in series:
+            self.update(x)
+        return self.value
+
+
+# Moving Average Convergence Divergence (TA-Lib MACD)
+# Both EMAs start at the same record as TA-Lib does, so the fast EMA is seeded with the fast period
+# records before the first slow EMA value.
+class MACD(object):
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        if slow_period < fast_period:
+            fast_period, slow_period = slow_period, fast_period
+        self.__fast = EMA(fast_period)
+        self.__slow = EMA(slow_period)
+        self.__signal = EMA(signal_period)
+        self.__recent = deque(maxlen=fast_period)
+        # MACD (DIF)
+        self.macd = nan
+        # Signal (DEA)
+        self.signal = nan
+        # Histogram
+        self.hist = nan
+
+    @property
+    def value(self) -> float:
+        return self.macd
+
+    def update(self, x: float) -> float:
+        if self.__recent is not None:
+            # Slow EMA not ready
+            self.__recent.append(x)
+            if math.isnan(self.__slow.update(x)):
+                return self.macd
+            total = 0.0
+            for r in self.__recent:
+                total += r
+            self.__fast.start(total / len(self.__recent))
+            self.__recent = None
+        else:
+            self.__fast.update(x)
+            self.__slow.update(x)
+
+        dif = self.__fast.value - self.__slow.value
+        signal = self.__signal.update(dif)
+        if not math.isnan(signal):
+            self.macd = dif
+            self.signal = signal
+            self.hist = dif - signal
+        return self.macd
+
+    def seed(self, series) -> float:
+        for x in series:
+            self.update(x)
+        return self.macd
+
+
+# Bollinger Bands with SMA basis (TA-Lib BBANDS, matype=SMA)
+class BBands(object):
+
+    def __init__(self, period: int = 5, nbdevup: float = 2, nbdevdn: float = 2):
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.__sma = SMA(period)
+        self.__window = deque()
+        self.__total2 = 0.0
+        self.upper = nan
+        self.middle = nan
+        self.lower = nan
+
+    @property
+    def value(self) -> float:
+        return self.middle
+
+    def update(self, x: float) -> float:
+        middle = self.__sma.update(x)
+        self.__window.append(x)
+        self.__total2 += x * x
+        if len(self.__window) == self.period:
+            # Population standard deviation from the sum of squares
+            mean2 = self.__total2 / self.period
+            old = self.__window.popleft()
+            self.__total2 -= old * old
+            mean2 -= middle * middle
+            std = math.sqrt(mean2) if mean2 >= 0.00000001 else 0.0
+            self.middle = middle
+            self.upper = middle + std * self.nbdevup
+            self.lower = middle - std * self.nbdevdn
+        return self.middle
+
+    def seed(self, series) -> float:
+        for x in series:
+            self.update(x)
+        return self.middle
+
+
+# Average True Range (TA-Lib ATR, Wilder's smoothing seeded with the SMA of the first true ranges)
+class ATR(object):
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = nan
+        self.__close = None
+        self.__sma = SMA(period)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev = self.__close
+        self.__close = close
+        if prev is None:
+            return self.value
+
+        tr = high - low
+        tr = max(tr, abs(prev - high), abs(prev - low))
+        if math.isnan(self.value):
+            self.value = self.__sma.update(tr)
+        else:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+    def seed(self, high, low, close) -> float:
+        for h, l, c in zip(high, low, close):
+            self.update(h, l, c)
+        return self.value
+
+
+# Momentum (TA-Lib MOM)
+class MOM(object):
+
+    def __init__(self, period: int = 10):
+        self.period = period
+        self.value = nan
+        self.__window = deque(maxlen=period + 1)
+
+    def update(self, x: float) -> float:
+        self.__window.append(x)
+        if len(self.__window) > self.period:
+            self.value = x - self.__window[0]
+        return self.value
+
+    def seed(self, series) -> float:
+        for x in series:
+            self.update(x)
+        return self.value
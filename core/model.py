@@ -1,3 +1,8 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
 # Order model
 def Order(id: int, symbol: str, type: str, side: str, amount: float, price=None, timestamp=None,
           status="unfilled") -> dict:
@@ -14,6 +19,153 @@ def Order(id: int, symbol: str, type: str, side: str, amount: float, price=None,
     }
 
 
+# Compact order storage (one row of a growable structured array per order)
+# Order IDs are row indices. Text fields are stored as codes of their distinct values.
+class OrderStore(object):
+    # Columns stored as codes
+    CODED = ('symbol', 'type', 'side', 'status')
+
+    DTYPE = np.dtype([('symbol', np.int16), ('type', np.int8), ('side', np.int8), ('status', np.int8),
+                      ('amount', np.float64), ('price', np.float64), ('timestamp', np.int64)])
+
+    def __init__(self, capacity: int = 1024):
+        self.__data = np.zeros(capacity, dtype=self.DTYPE)
+        self.__length = 0
+
+        # Distinct values and their codes of each coded column
+        self.__values = {k: [] for k in self.CODED}
+        self.__codes = {k: {} for k in self.CODED}
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, o_id: int):
+        if not 0 <= o_id < self.__length:
+            raise IndexError('Order not found')
+        return OrderView(self, o_id)
+
+    def __iter__(self):
+        for i in range(self.__length):
+            yield OrderView(self, i)
+
+    # Append an order, return its view
+    def append(self, symbol: str, type: str, side: str, amount: float, price: float, timestamp: int,
+               status: str = "unfilled"):
+        if self.__length == len(self.__data):
+            # Grow by doubling
+            data = np.zeros(2 * len(self.__data), dtype=self.DTYPE)
+            data[:self.__length] = self.__data
+            self.__data = data
+
+        i = self.__length
+        self.__data[i] = (self.code('symbol', symbol), self.code('type', type), self.code('side', side),
+                          self.code('status', status), amount, price, timestamp)
+        self.__length += 1
+        return OrderView(self, i)
+
+    # Code of a value in a coded column (added if new)
+    def code(self, key: str, value) -> int:
+        codes = self.__codes[key]
+        if value not in codes:
+            codes[value] = len(self.__values[key])
+            self.__values[key].append(value)
+        return codes[value]
+
+    # Distinct values of a coded column (by code)
+    def values(self, key: str) -> list:
+        return self.__values[key]
+
+    # Column of all orders (codes for coded columns)
+    def column(self, key: str) -> np.ndarray:
+        return self.__data[key][:self.__length]
+
+    def get(self, i: int, key: str):
+        if key == 'id':
+            return i
+        if key == 'clientOrderId':
+            return None
+        v = self.__data[key][i].item()
+        return self.__values[key][v] if key in self.__codes else v
+
+    def set(self, i: int, key: str, value):
+        if key not in self.DTYPE.names:
+            raise KeyError(key)
+        self.__data[key][i] = self.code(key, value) if key in self.__codes else value
+
+
+# Dict-compatible view of an order in OrderStore (changes are written to the store)
+class OrderView(Mapping):
+    __slots__ = ('__store', '__i')
+
+    KEYS = ('id', 'clientOrderId', 'symbol', 'type', 'side', 'amount', 'price', 'timestamp', 'status')
+
+    def __init__(self, store: OrderStore, i: int):
+        self.__store = store
+        self.__i = i
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return self.__store.get(self.__i, key)
+
+    def __setitem__(self, key, value):
+        self.__store.set(self.__i, key, value)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+# OHLCV model (columnar k-lines)
+# Columns are NumPy arrays, usually views of the backtesting history buffer (do not modify in place).
+# Indexing and slicing behave like the list of [timestamp, open, high, low, close, volume] records.
+class OHLCV(object):
+
+    def __init__(self, timestamp: np.ndarray, values: np.ndarray, duplicate: bool = False):
+        # Timestamp column (ms)
+        self.timestamp = timestamp
+        # Price and volume columns
+        self.values = values
+        self.open, self.high, self.low, self.close, self.volume = values
+        # Whether the last record is repeated (unfinished k-line in backtesting)
+        self.duplicate = duplicate and len(timestamp) > 0
+
+    def __len__(self):
+        return len(self.timestamp) + self.duplicate
+
+    def __getitem__(self, key):
+        n = len(self.timestamp)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise Exception("OHLCV only supports contiguous slices.")
+            duplicate = self.duplicate and stop > n
+            if duplicate and start >= n:
+                # Only the repeated record
+                return OHLCV(self.timestamp[n - 1:n], self.values[:, n - 1:n])
+            stop = min(stop, n)
+            return OHLCV(self.timestamp[start:stop], self.values[:, start:stop], duplicate)
+
+        i = key + len(self) if key < 0 else key
+        if not 0 <= i < len(self):
+            raise IndexError('OHLCV index out of range')
+        i = min(i, n - 1)
+        return [int(self.timestamp[i])] + self.values[:, i].tolist()
+
+
+# Convert a list of [timestamp, open, high, low, close, volume] records to OHLCV (no copy if already OHLCV)
+def to_ohlcv(records) -> OHLCV:
+    if isinstance(records, OHLCV):
+        return records
+    r = np.asarray(records, dtype=np.float64).reshape(-1, 6)
+    return OHLCV(r[:, 0].astype(np.int64), np.ascontiguousarray(r[:, 1:].T))
+
+
 # Performance information model
 class PerfInfo:
 
@@ -62,7 +214,19 @@ class PerfInfo:
         self.percent_profitable = 0
         # Commission Paid
         self.commission_paid = 0
+        # Max drawdown of equity (ratio to the peak)
+        self.max_drawdown = 0
+        # Longest time below the previous equity peak (seconds)
+        self.max_drawdown_duration = 0
+        # Annualized Sharpe ratio of returns per k-line
+        self.sharpe = 0
+        # Annualized Sortino ratio of returns per k-line
+        self.sortino = 0
+        # Ratio of k-lines with an open position
+        self.exposure = 0
         # PnL History
         self.pnl_history = []
         # Cumulative PnL History
         self.cum_pnl_history = []
+        # Performance by symbol (without histories)
+        self.symbol_perf = {}
@@ -1,81 +1,139 @@
+import hashlib
 import json
+import os
+import threading
 
+from core.util import write_atomic
 
+# Journal entries between two compactions
+COMPACT_EVERY = 100
+
+
+# Order records kept in memory
+# Changes are appended to a journal (<orders_path>.journal, one JSON entry per line) and compacted into the snapshot
+# (<orders_path>) periodically. State is recovered from snapshot and journal on startup.
+# All methods are thread-safe (jobs of different schedulers share the manager).
 class OrderManager(object):
 
-    def __init__(self, orders_path: str):
+    def __init__(self, orders_path: str, compact_every: int = COMPACT_EVERY):
         self.__orders_path = orders_path
+        self.__journal_path = f'{orders_path}.journal'
+        self.__compact_every = compact_every
+        self.__lock = threading.RLock()
+
+        # Orders by name
+        self.__orders = self.load(orders_path)
+
+        # Start with an empty journal
+        self.__journal = open(self.__journal_path, 'a')
+        self.compact()
 
     def create(self, name: str, order):
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                orders[name].append(self.sim_order(order))
-            else:
-                orders[name] = []
-                orders[name].append(self.sim_order(order))
-            with open(self.__orders_path, 'w') as outfile:
-                json.dump(orders, outfile)
+        self.__apply(['create', name, self.sim_order(order)])
 
     def remove(self, name: str, o_id):
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                orders[name] = [o for o in orders[name] if o['id'] != o_id]
-                with open(self.__orders_path, 'w') as outfile:
-                    json.dump(orders, outfile)
+        self.__apply(['remove', name, o_id])
 
     # Replace old order (by id) with new order
     def replace(self, name: str, o_id, new_order):
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                orders[name] = [o for o in orders[name] if o['id'] != o_id]
-                orders[name].append(self.sim_order(new_order))
-            with open(self.__orders_path, 'w') as outfile:
-                json.dump(orders, outfile)
+        self.__apply(['replace', name, o_id, self.sim_order(new_order)])
 
     def remove_last(self, name: str):
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                orders[name] = orders[name][:-1]
-                with open(self.__orders_path, 'w') as outfile:
-                    json.dump(orders, outfile)
+        self.__apply(['remove_last', name])
 
     def clear(self, name: str):
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                orders[name] = []
-                with open(self.__orders_path, 'w') as outfile:
-                    json.dump(orders, outfile)
+        self.__apply(['clear', name])
 
     def get_length(self, name: str) -> int:
-        length = 0
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                length = len(orders[name])
-
-        return length
+        with self.__lock:
+            return len(self.__orders[name]) if name in self.__orders else 0
 
     # Get all orders with name
     def get_orders(self, name: str) -> list:
-        r = []
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
-            if name in orders.keys():
-                r = orders[name]
-
-        return r
+        with self.__lock:
+            return [dict(o) for o in self.__orders[name]] if name in self.__orders else []
 
     # get all orders
     def get_all(self) -> dict:
-        with open(self.__orders_path) as orders_file:
-            orders = json.load(orders_file)
+        with self.__lock:
+            return {name: [dict(o) for o in orders] for name, orders in self.__orders.items()}
+
+    # Write all orders to the snapshot and empty the journal
+    def compact(self):
+        with self.__lock:
+            snapshot = json.dumps(self.__orders)
+
+            # Mark the journal as included in the snapshot first, in case of a crash before the journal is emptied
+            self.__journal.write(json.dumps(['compact', self.__digest(snapshot)]) + '\n')
+            self.__journal.flush()
+            self.__journal.close()
+
+            write_atomic(self.__orders_path, snapshot)
+
+            self.__journal = open(self.__journal_path, 'w')
+            self.__entries = 0
+
+    def __apply(self, entry: list):
+        with self.__lock:
+            self.__replay(self.__orders, entry)
+            self.__journal.write(json.dumps(entry) + '\n')
+            self.__journal.flush()
+            self.__entries += 1
+            if self.__entries >= self.__compact_every:
+                self.compact()
+
+    # Load the snapshot and replay the journal after the last compaction of that snapshot (files are not changed)
+    @staticmethod
+    def load(orders_path: str) -> dict:
+        snapshot = '{}'
+        if os.path.exists(orders_path):
+            with open(orders_path) as orders_file:
+                snapshot = orders_file.read()
+        orders = json.loads(snapshot)
+
+        entries = []
+        journal_path = f'{orders_path}.journal'
+        if os.path.exists(journal_path):
+            with open(journal_path) as journal_file:
+                for line in journal_file:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Incomplete last entry of an interrupted write
+                        break
+
+        # Skip entries already compacted into the snapshot
+        digest = OrderManager.__digest(snapshot)
+        for k in range(len(entries) - 1, -1, -1):
+            if entries[k][0] == 'compact' and entries[k][1] == digest:
+                entries = entries[k + 1:]
+                break
+
+        for entry in entries:
+            OrderManager.__replay(orders, entry)
         return orders
 
+    @staticmethod
+    def __replay(orders: dict, entry: list):
+        op, name = entry[0], entry[1]
+        if op == 'create':
+            orders.setdefault(name, []).append(entry[2])
+        elif op == 'compact' or name not in orders:
+            return
+        elif op == 'remove':
+            orders[name] = [o for o in orders[name] if o['id'] != entry[2]]
+        elif op == 'replace':
+            orders[name] = [o for o in orders[name] if o['id'] != entry[2]]
+            orders[name].append(entry[3])
+        elif op == 'remove_last':
+            orders[name] = orders[name][:-1]
+        elif op == 'clear':
+            orders[name] = []
+
+    @staticmethod
+    def __digest(snapshot: str) -> str:
+        return hashlib.sha1(snapshot.encode()).hexdigest()
+
     @staticmethod
     def sim_order(order):
         return {
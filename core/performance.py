@@ -1,172 +1,281 @@
-from core.model import PerfInfo
+import numpy as np
+
+from core.model import OrderStore, PerfInfo
 
 precision = 10
 
 
 # TODO funding, fee, rate, etc.
+# Orders are an OrderStore or a list of orders, evaluated in the given order (not sorted by timestamp)
+# Sums are accumulated in order of orders (cumsum) to give the same results as adding them one by one
 def get_performance(orders, taker_fee: float, maker_fee: float) -> PerfInfo:
     perf = PerfInfo()
     if len(orders) < 1:
         return perf
 
-    # Classify orders by symbol
-    order_s = {}
-    for o in orders:
-        symbol = o['symbol']
-        if symbol not in order_s.keys():
-            order_s[symbol] = []
-        order_s[symbol].append(o)
+    c = order_columns(orders)
 
-    # Calculate performance by symbol
+    # Calculate performance by symbol (in order of first appearance)
     perfs = []
-    for os in order_s.values():
-        perfs.append(get_symbol_perf(os, taker_fee, maker_fee))
+    timestamps = []
+    pnls = []
+    codes, first = np.unique(c['symbol'], return_index=True)
+    for code in codes[np.argsort(first)].tolist():
+        p, t, pnl = _symbol_perf(c, c['symbol'] == code, taker_fee, maker_fee, histories=False)
+        perfs.append(p)
+        timestamps.append(t)
+        pnls.append(pnl)
+        perf.symbol_perf[c['symbols'][code]] = {k: v for k, v in p.__dict__.items()
+                                                if k not in ('pnl_history', 'cum_pnl_history', 'symbol_perf')}
 
     # Calculate total performance
-    pnl_history = {}
     for p in perfs:
-        for pnl in p.pnl_history:
-            if pnl[0] not in pnl_history.keys():
-                pnl_history[pnl[0]] = 0
-            pnl_history[pnl[0]] += pnl[1]
-
-        perf.pnl += p.pnl
-        perf.long_pnl += p.long_pnl
-        perf.short_pnl += p.short_pnl
-        perf.gross_profit += p.gross_profit
-        perf.long_gross_profit += p.long_gross_profit
-        perf.short_gross_profit += p.short_gross_profit
-        perf.gross_loss += p.gross_loss
-        perf.long_gross_loss += p.long_gross_loss
-        perf.short_gross_loss += p.short_gross_loss
-        perf.win += p.win
-        perf.win_long += p.win_long
-        perf.win_short += p.win_short
-        perf.loss += p.loss
-        perf.loss_long += p.loss_long
-        perf.loss_short += p.loss_short
-        perf.commission_paid += p.commission_paid
+        _add(perf, p)
 
     perf.percent_profitable = perf.win / (perf.win + perf.loss) if perf.win > 0 else 0
 
-    for i in sorted(pnl_history.keys()):
-        perf.pnl_history.append([i, pnl_history[i]])
+    # Sum PnL of all symbols by timestamp
+    times, index = np.unique(np.concatenate(timestamps), return_inverse=True)
+    pnl = np.zeros(len(times))
+    np.add.at(pnl, index, np.concatenate(pnls))
+
+    perf.pnl_history = _history(times, pnl)
+    perf.cum_pnl_history = _history(times, np.cumsum(pnl))
+    _pnl_range(perf, pnl)
+
+    return perf
+
 
-    if len(perf.pnl_history) > 0:
-        c = 0
-        for i in range(0, len(perf.pnl_history)):
-            c += perf.pnl_history[i][1]
-            perf.cum_pnl_history.append([perf.pnl_history[i][0], c])
+# Risk metrics from the equity at the close of each k-line
+# timeframe: seconds per k-line for annualization (trading all year round)
+def get_equity_perf(perf: PerfInfo, timestamp: np.ndarray, equity: np.ndarray, exposed: np.ndarray, timeframe: int):
+    if len(equity) < 2:
+        return perf
 
-    pnl_h = [r[1] for r in perf.pnl_history]
-    pnl_cum_h = [r[1] for r in perf.cum_pnl_history]
-    perf.pnl_max = max(pnl_h) if len(pnl_h) > 0 else 0
-    perf.pnl_min = min(pnl_h) if len(pnl_h) > 0 else 0
-    perf.cum_pnl_max = max(pnl_cum_h) if len(pnl_cum_h) > 0 else 0
-    perf.cum_pnl_min = min(pnl_cum_h) if len(pnl_cum_h) > 0 else 0
+    # Drawdown from the running peak
+    peak = np.maximum.accumulate(equity)
+    perf.max_drawdown = float(np.max((peak - equity) / peak))
 
+    # Time since the last peak
+    k = np.arange(len(equity))
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, k, 0))
+    perf.max_drawdown_duration = int(np.max(timestamp - timestamp[last_peak])) // 1000
+
+    returns = np.diff(equity) / equity[:-1]
+    scale = np.sqrt(365 * 24 * 60 * 60 / timeframe)
+    std = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    perf.sharpe = float(returns.mean() / std * scale) if std > 0 else 0
+    perf.sortino = float(returns.mean() / downside * scale) if downside > 0 else 0
+    perf.exposure = float(np.count_nonzero(exposed) / len(exposed))
     return perf
 
 
+# Columns of orders: symbol (codes), symbols (by code), market, buy, filled (masks), amount, price, timestamp
+def order_columns(orders) -> dict:
+    if isinstance(orders, OrderStore):
+        def match(key, value):
+            values = orders.values(key)
+            return orders.column(key) == (values.index(value) if value in values else -1)
+
+        return {
+            'symbol': orders.column('symbol').astype(np.int64),
+            'symbols': list(orders.values('symbol')),
+            'market': match('type', 'market'),
+            'buy': match('side', 'buy'),
+            'filled': match('status', 'filled'),
+            'amount': orders.column('amount').astype(np.float64),
+            'price': orders.column('price').astype(np.float64),
+            'timestamp': orders.column('timestamp').astype(np.int64)
+        }
+
+    codes = {}
+    return {
+        'symbol': np.array([codes.setdefault(o['symbol'], len(codes)) for o in orders], dtype=np.int64),
+        'symbols': list(codes.keys()),
+        'market': np.array([o['type'] == 'market' for o in orders], dtype=bool),
+        'buy': np.array([o['side'] == 'buy' for o in orders], dtype=bool),
+        'filled': np.array([o['status'] == 'filled' for o in orders], dtype=bool),
+        'amount': np.array([o['amount'] for o in orders], dtype=np.float64),
+        'price': np.array([o['price'] for o in orders], dtype=np.float64),
+        'timestamp': np.array([o['timestamp'] for o in orders], dtype=np.int64)
+    }
+
+
 # Get performance for orders with the same symbol
 def get_symbol_perf(orders, taker_fee: float, maker_fee: float) -> PerfInfo:
+    c = order_columns(orders)
+    return _symbol_perf(c, np.ones(len(c['symbol']), dtype=bool), taker_fee, maker_fee)[0]
+
+
+# Return <PerfInfo (with PnL histories by flag), timestamps of PnL, PnL>
+def _symbol_perf(c: dict, selected: np.ndarray, taker_fee: float, maker_fee: float, histories: bool = True):
     perf = PerfInfo()
 
-    # Entry price
-    entry_price = 0
-    # Total long amount
-    long_amount = 0
-    # Total short amount
-    short_amount = 0
-    # Position type
-    position_type = None
-    for o in orders:
-        if o['status'] != "filled":
-            continue
+    selected = selected & c['filled']
+    buy = c['buy'][selected]
+    amount = c['amount'][selected]
+    price = c['price'][selected]
+    timestamp = c['timestamp'][selected]
+
+    # Calculate paid commission
+    fee = np.where(c['market'][selected], taker_fee, maker_fee)
+    perf.commission_paid = _sum(price * amount * fee / 100)
+
+    # PnL of closing orders
+    closing, pnl, long = _close_pnl(buy.tolist(), amount.tolist(), price.tolist())
+    pnl = np.array(pnl, dtype=np.float64)
+    long = np.array(long, dtype=bool)
+    profit = pnl > 0
+
+    # Calculate statistics
+    perf.long_gross_profit = _sum(pnl[long & profit])
+    perf.short_gross_profit = _sum(pnl[~long & profit])
+    perf.long_gross_loss = _sum(-pnl[long & ~profit])
+    perf.short_gross_loss = _sum(-pnl[~long & ~profit])
+    perf.win_long = int(np.count_nonzero(long & profit))
+    perf.win_short = int(np.count_nonzero(~long & profit))
+    perf.loss_long = int(np.count_nonzero(long & ~profit))
+    perf.loss_short = int(np.count_nonzero(~long & ~profit))
+
+    # PnL history and cumulative PnL History
+    times = timestamp[closing]
+    if histories:
+        perf.pnl_history = _history(times, pnl)
+        perf.cum_pnl_history = _history(times, np.cumsum(pnl))
+
+    _total(perf)
+    _pnl_range(perf, pnl)
+
+    return perf, times, pnl
+
+
+# Incremental performance of a growing order stream (e.g. live emulation)
+# Each filled order is added once, snapshots take O(symbols) time (without PnL histories)
+class PerfAccumulator(object):
+
+    def __init__(self, taker_fee: float, maker_fee: float):
+        self.__taker_fee = taker_fee
+        self.__maker_fee = maker_fee
+
+        # Position by symbol (in order of first appearance)
+        self.__positions = {}
+
+        # Performance by symbol (statistics of closing orders)
+        self.__perfs = {}
+
+        # Cumulative PnL by symbol
+        self.__cum_pnl = {}
+
+        # PnL of closing orders summed by timestamp:
+        # timestamp of the last closing order, PnL at that timestamp, cumulative PnL before it
+        self.__time = None
+        self.__pnl = 0
+        self.__cum_pnl_before = 0
+
+        # <max PnL, min PnL, max cumulative PnL, min cumulative PnL> of earlier timestamps
+        self.__range = None
+
+    # Add a filled order
+    def add(self, order):
+        symbol = order['symbol']
+        if symbol not in self.__positions:
+            self.__positions[symbol] = Position()
+            self.__perfs[symbol] = PerfInfo()
+            self.__cum_pnl[symbol] = 0
+        perf = self.__perfs[symbol]
 
         # Calculate paid commission
-        fee = taker_fee if o['type'] == 'market' else maker_fee
-        perf.commission_paid += o['price'] * o['amount'] * fee / 100
+        fee = self.__taker_fee if order['type'] == 'market' else self.__maker_fee
+        perf.commission_paid += order['price'] * order['amount'] * fee / 100
 
-        # First order determines position type
-        if position_type is None:
-            position_type = 'long' if o['side'] == 'buy' else 'short'
-        if o['side'] == 'buy' and position_type == 'long':
-            # Calculate total value
-            total = entry_price * long_amount + o['amount'] * o['price']
-            # Increase amount
-            long_amount += o['amount']
-            # Liquidate entry price
-            entry_price = total / long_amount
-        elif o['side'] == 'sell' and position_type == 'long':
-            if long_amount > o['amount']:
-                # Close long partially
-                pnl = (o['price'] - entry_price) * o['amount']
-                long_amount -= o['amount']
-            elif long_amount == o['amount']:
-                # Close long totally
-                pnl = (o['price'] - entry_price) * long_amount
-                long_amount = 0
-                position_type = None
-            else:
-                # Close long totally and open short
-                pnl = (o['price'] - entry_price) * long_amount
-                long_amount = 0
-                short_amount = o['amount'] - long_amount
-                position_type = 'short'
-            # Calculate statistics
-            if pnl > 0:
+        closed = self.__positions[symbol].fill(order['side'] == 'buy', order['amount'], order['price'])
+        if closed is None:
+            return
+        pnl, long = closed
+
+        # Statistics by symbol
+        if pnl > 0:
+            if long:
                 perf.long_gross_profit += pnl
                 perf.win_long += 1
             else:
-                perf.long_gross_loss -= pnl
-                perf.loss_long += 1
-            # Append to history list
-            perf.pnl_history.append([o['timestamp'], pnl])
-
-        elif o['side'] == 'sell' and position_type == 'short':
-            # Calculate total value
-            total = entry_price * short_amount + o['amount'] * o['price']
-            # Increase amount
-            short_amount += o['amount']
-            # Liquidate entry price
-            entry_price = total / short_amount
-        elif o['side'] == 'buy' and position_type == 'short':
-            if short_amount > o['amount']:
-                # Close short partially
-                pnl = (entry_price - o['price']) * o['amount']
-                short_amount -= o['amount']
-            elif short_amount == o['amount']:
-                # Close short totally
-                pnl = (entry_price - o['price']) * short_amount
-                short_amount = 0
-                position_type = None
-            else:
-                # Close short totally and open long
-                pnl = (entry_price - o['price']) * short_amount
-                short_amount = 0
-                long_amount = o['amount'] - short_amount
-                position_type = 'long'
-            # Calculate statistics
-            if pnl > 0:
                 perf.short_gross_profit += pnl
                 perf.win_short += 1
+        else:
+            if long:
+                perf.long_gross_loss -= pnl
+                perf.loss_long += 1
             else:
                 perf.short_gross_loss -= pnl
                 perf.loss_short += 1
-            # Append to history list
-            perf.pnl_history.append([o['timestamp'], pnl])
-        long_amount = round(long_amount, precision)
-        short_amount = round(short_amount, precision)
-
-    # Cumulative PnL History
-    if len(perf.pnl_history) > 0:
-        c = 0
-        for i in range(0, len(perf.pnl_history)):
-            c += perf.pnl_history[i][1]
-            perf.cum_pnl_history.append([perf.pnl_history[i][0], c])
-
-    # Total
+        cum_pnl = self.__cum_pnl[symbol] = self.__cum_pnl[symbol] + pnl
+        first = perf.win + perf.loss == 0
+        perf.pnl_max = pnl if first else max(perf.pnl_max, pnl)
+        perf.pnl_min = pnl if first else min(perf.pnl_min, pnl)
+        perf.cum_pnl_max = cum_pnl if first else max(perf.cum_pnl_max, cum_pnl)
+        perf.cum_pnl_min = cum_pnl if first else min(perf.cum_pnl_min, cum_pnl)
+        perf.win = perf.win_long + perf.win_short
+        perf.loss = perf.loss_long + perf.loss_short
+
+        # Sum PnL of all symbols by timestamp (orders are added in order of time)
+        if order['timestamp'] != self.__time:
+            if self.__time is not None:
+                self.__range = self.__with_last()
+                self.__cum_pnl_before += self.__pnl
+            self.__time = order['timestamp']
+            self.__pnl = 0
+        self.__pnl += pnl
+
+    # Range including the PnL at the last timestamp
+    def __with_last(self):
+        pnl = self.__pnl
+        cum_pnl = self.__cum_pnl_before + pnl
+        if self.__range is None:
+            return pnl, pnl, cum_pnl, cum_pnl
+        pnl_max, pnl_min, cum_pnl_max, cum_pnl_min = self.__range
+        return max(pnl_max, pnl), min(pnl_min, pnl), max(cum_pnl_max, cum_pnl), min(cum_pnl_min, cum_pnl)
+
+    # Performance of all orders added so far
+    def snapshot(self) -> PerfInfo:
+        perf = PerfInfo()
+        perf.symbol_perf = {}
+        for symbol, p in self.__perfs.items():
+            s = PerfInfo()
+            s.__dict__.update(p.__dict__)
+            _total(s)
+            _add(perf, s)
+            perf.symbol_perf[symbol] = {k: v for k, v in s.__dict__.items()
+                                        if k not in ('pnl_history', 'cum_pnl_history', 'symbol_perf')}
+
+        perf.percent_profitable = perf.win / (perf.win + perf.loss) if perf.win > 0 else 0
+        if self.__time is not None:
+            perf.pnl_max, perf.pnl_min, perf.cum_pnl_max, perf.cum_pnl_min = self.__with_last()
+        return perf
+
+
+# Add statistics of a symbol to the total
+def _add(perf: PerfInfo, p: PerfInfo):
+    perf.pnl += p.pnl
+    perf.long_pnl += p.long_pnl
+    perf.short_pnl += p.short_pnl
+    perf.gross_profit += p.gross_profit
+    perf.long_gross_profit += p.long_gross_profit
+    perf.short_gross_profit += p.short_gross_profit
+    perf.gross_loss += p.gross_loss
+    perf.long_gross_loss += p.long_gross_loss
+    perf.short_gross_loss += p.short_gross_loss
+    perf.win += p.win
+    perf.win_long += p.win_long
+    perf.win_short += p.win_short
+    perf.loss += p.loss
+    perf.loss_long += p.loss_long
+    perf.loss_short += p.loss_short
+    perf.commission_paid += p.commission_paid
+
+
+# Totals from long and short statistics
+def _total(perf: PerfInfo):
     perf.gross_profit = perf.long_gross_profit + perf.short_gross_profit
     perf.gross_loss = perf.long_gross_loss + perf.short_gross_loss
     perf.long_pnl = perf.long_gross_profit - perf.long_gross_loss
@@ -176,12 +285,114 @@ def get_symbol_perf(orders, taker_fee: float, maker_fee: float) -> PerfInfo:
     perf.loss = perf.loss_long + perf.loss_short
     perf.percent_profitable = perf.win / (perf.win + perf.loss) if perf.win > 0 else 0
 
-    pnl_h = [r[1] for r in perf.pnl_history]
-    pnl_cum_h = [r[1] for r in perf.cum_pnl_history]
 
-    perf.pnl_max = max(pnl_h) if len(pnl_h) > 0 else 0
-    perf.pnl_min = min(pnl_h) if len(pnl_h) > 0 else 0
-    perf.cum_pnl_max = max(pnl_cum_h) if len(pnl_cum_h) > 0 else 0
-    perf.cum_pnl_min = min(pnl_cum_h) if len(pnl_cum_h) > 0 else 0
+# Track the position through filled orders (the only sequential part)
+# Return <indices of closing orders, PnL of each, whether each closed a long position>
+def _close_pnl(buy: list, amount: list, price: list):
+    closing = []
+    pnls = []
+    longs = []
 
-    return perf
+    fill = Position().fill
+    for k in range(len(buy)):
+        closed = fill(buy[k], amount[k], price[k])
+        if closed is not None:
+            closing.append(k)
+            pnls.append(closed[0])
+            longs.append(closed[1])
+    return closing, pnls, longs
+
+
+# Position of one symbol
+# Amounts are rounded when changed (rounding is idempotent, same as rounding both after every order)
+class Position(object):
+    __slots__ = ('entry_price', 'long_amount', 'short_amount', 'type')
+
+    def __init__(self):
+        # Entry price
+        self.entry_price = 0
+        # Total long amount
+        self.long_amount = 0
+        # Total short amount
+        self.short_amount = 0
+        # Position type
+        self.type = None
+
+    # Apply a filled order
+    # Return <PnL, whether a long position is closed> of a closing order, None otherwise
+    def fill(self, buy: bool, a: float, p: float):
+        # First order determines position type
+        if self.type is None:
+            self.type = 'long' if buy else 'short'
+        if buy and self.type == 'long':
+            # Calculate total value
+            total = self.entry_price * self.long_amount + a * p
+            # Increase amount
+            long_amount = self.long_amount + a
+            # Liquidate entry price
+            self.entry_price = total / long_amount
+            self.long_amount = round(long_amount, precision)
+        elif not buy and self.type == 'long':
+            long_amount = self.long_amount
+            if long_amount > a:
+                # Close long partially
+                pnl = (p - self.entry_price) * a
+                self.long_amount = round(long_amount - a, precision)
+            elif long_amount == a:
+                # Close long totally
+                pnl = (p - self.entry_price) * long_amount
+                self.long_amount = 0
+                self.type = None
+            else:
+                # Close long totally and open short
+                pnl = (p - self.entry_price) * long_amount
+                self.long_amount = 0
+                self.short_amount = round(a, precision)
+                self.type = 'short'
+            return pnl, True
+        elif not buy and self.type == 'short':
+            # Calculate total value
+            total = self.entry_price * self.short_amount + a * p
+            # Increase amount
+            short_amount = self.short_amount + a
+            # Liquidate entry price
+            self.entry_price = total / short_amount
+            self.short_amount = round(short_amount, precision)
+        else:
+            short_amount = self.short_amount
+            if short_amount > a:
+                # Close short partially
+                pnl = (self.entry_price - p) * a
+                self.short_amount = round(short_amount - a, precision)
+            elif short_amount == a:
+                # Close short totally
+                pnl = (self.entry_price - p) * short_amount
+                self.short_amount = 0
+                self.type = None
+            else:
+                # Close short totally and open long
+                pnl = (self.entry_price - p) * short_amount
+                self.short_amount = 0
+                self.long_amount = round(a, precision)
+                self.type = 'long'
+            return pnl, False
+        return None
+
+
+# [[timestamp, value]]
+def _history(timestamps: np.ndarray, values: np.ndarray) -> list:
+    return list(map(list, zip(timestamps.tolist(), values.tolist())))
+
+
+# Sum in order (0 if empty)
+def _sum(values: np.ndarray):
+    return np.cumsum(values)[-1].item() if len(values) > 0 else 0
+
+
+def _pnl_range(perf: PerfInfo, pnl: np.ndarray):
+    if len(pnl) > 0:
+        cum_pnl = np.cumsum(pnl)
+        perf.pnl_max = pnl.max().item()
+        perf.pnl_min = pnl.min().item()
+        perf.cum_pnl_max = cum_pnl.max().item()
+        perf.cum_pnl_min = cum_pnl.min().item()
@@ -0,0 +1,42 @@
+import json
+
+import pandas as pd
+
+
+# Plot PnL and cumulative PnL history into an SVG file
+# matplotlib is only imported when plotting
+def plot_pnl(pnl_history: list, cum_pnl_history: list, path: str):
+    import matplotlib.pyplot as plt
+
+    # Plot PnL figures
+    fig, (ax1, ax2) = plt.subplots(2)
+    fig.suptitle('PnL Figures')
+    # Plot PnL history
+    pnl_timestamps = [r[0] for r in pnl_history]
+    pnl = [r[1] for r in pnl_history]
+    ax1.plot(pd.to_datetime(pnl_timestamps, unit='ms'), pnl)
+    ax1.set_title("PnL")
+    ax1.set_xlabel("Time")
+    ax1.tick_params(axis='x', rotation=45)
+    ax1.set_ylabel("PnL")
+    # Plot cumulative PnL history
+    cum_pnl_timestamps = [r[0] for r in cum_pnl_history]
+    cum_pnl = [r[1] for r in cum_pnl_history]
+    ax2.plot(pd.to_datetime(cum_pnl_timestamps, unit='ms'), cum_pnl)
+    ax2.set_title("Cummulative PnL")
+    ax2.set_xlabel("Time")
+    ax2.tick_params(axis='x', rotation=45)
+    ax2.set_ylabel("Cum PnL")
+
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close(fig)
+
+
+# Render PnL figures of a backtesting result from its raw PnL information
+def render(result_dir: str, raw_subdir: str = 'raw/'):
+    with open(f'{result_dir}{raw_subdir}pnl.json') as pnl_file:
+        pnl_history = json.load(pnl_file)
+    with open(f'{result_dir}{raw_subdir}cum_pnl.json') as cum_pnl_file:
+        cum_pnl_history = json.load(cum_pnl_file)
+    plot_pnl(pnl_history, cum_pnl_history, f'{result_dir}pnl_history.svg')
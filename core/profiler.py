@@ -0,0 +1,165 @@
+import functools
+import inspect
+import logging
+import time
+
+import numpy as np
+
+from core import trade_lib
+
+# Bot methods of order handling
+ORDER_METHODS = ['buy_limit', 'buy_market', 'buy_gtx', 'sell_limit', 'sell_market', 'sell_gtx', 'get_order',
+                 'cancel_order', 'cancel_unfilled_orders', 'get_ticker']
+
+# Methods of indicator classes
+INDICATOR_METHODS = ['__init__', 'update']
+
+# Number of the slowest bars reported
+HOT_SPOTS = 10
+
+
+# Per-bar timing of backtesting stages
+# Stages are timed by wrapping functions in place, nested stages are included in the outer ones
+# Only the outermost call of a stage is timed (e.g. buy_limit called by buy_gtx)
+class Profiler(object):
+
+    def __init__(self):
+        # Stage names in order of registration
+        self.__stages = []
+
+        # Time spent in each stage during the current bar
+        self.__current = {}
+
+        # Time spent in each stage of every bar
+        self.__bars = {}
+
+        # Number of calls of each stage
+        self.__calls = {}
+
+        # Depth of running calls of each stage
+        self.__depth = {}
+
+        # Timestamp of every bar
+        self.__timestamps = []
+
+        # <owner, name, original> of wrapped functions
+        self.__wrapped = []
+
+    # Wrap bot, strategy and library functions
+    def attach(self, bot, strategy):
+        self.__wrap(bot, 'step', 'bot.next')
+        self.__wrap(bot, 'get_ohlcv', 'get_ohlcv')
+        for name in ORDER_METHODS:
+            self.__wrap(bot, name, 'orders')
+
+        # Indicator classes used by the strategy module
+        module = __import__(type(strategy).__module__, fromlist=['*'])
+        for value in vars(module).values():
+            if isinstance(value, type) and '.indicator.' in value.__module__:
+                for name in INDICATOR_METHODS:
+                    if name in vars(value):
+                        self.__wrap(value, name, 'indicators')
+
+        self.__wrap(trade_lib, 'crossed', 'trade_lib.crossed')
+        self.__wrap(logging, 'info', 'logging.info')
+
+        # A bar ends after the strategy is executed
+        run = strategy.run
+
+        @functools.wraps(run)
+        def timed_run(current_time=None):
+            self.__timestamps.append(current_time)
+            start = time.perf_counter()
+            try:
+                return run(current_time)
+            finally:
+                self.__current['strategy.run'] = time.perf_counter() - start
+                self.__end_bar()
+
+        self.__register('strategy.run')
+        strategy.run = timed_run
+        self.__wrapped.append((strategy, 'run', None))
+
+    # Restore wrapped functions
+    def detach(self):
+        for owner, name, original in reversed(self.__wrapped):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.__wrapped = []
+
+    def __register(self, stage: str):
+        if stage not in self.__stages:
+            self.__stages.append(stage)
+            self.__bars[stage] = []
+            self.__calls[stage] = 0
+            self.__depth[stage] = 0
+
+    def __wrap(self, owner, name: str, stage: str):
+        self.__register(stage)
+        original = vars(owner).get(name) if isinstance(owner, type) else getattr(owner, name)
+        current = self.__current
+        calls = self.__calls
+        depth = self.__depth
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            if depth[stage] > 0:
+                # Nested call, timed by the outer one
+                return original(*args, **kwargs)
+            depth[stage] += 1
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                current[stage] = current.get(stage, 0) + time.perf_counter() - start
+                calls[stage] += 1
+                depth[stage] -= 1
+
+        setattr(owner, name, timed)
+        # Instance attributes are removed to restore the method of the class
+        instance = not (isinstance(owner, type) or inspect.ismodule(owner))
+        self.__wrapped.append((owner, name, None if instance else original))
+
+    def __end_bar(self):
+        self.__calls['strategy.run'] += 1
+        for stage in self.__stages:
+            self.__bars[stage].append(self.__current.get(stage, 0))
+        self.__current.clear()
+
+    # Summary of totals and percentiles (per bar) of each stage, and the slowest bars
+    def report(self) -> dict:
+        stages = {}
+        for stage in self.__stages:
+            t = np.array(self.__bars[stage])
+            if len(t) == 0:
+                continue
+            stages[stage] = {
+                'total': float(t.sum()),
+                'calls': self.__calls[stage],
+                'mean': float(t.mean()),
+                'p50': float(np.percentile(t, 50)),
+                'p90': float(np.percentile(t, 90)),
+                'p99': float(np.percentile(t, 99)),
+                'max': float(t.max())
+            }
+
+        hot_spots = []
+        if len(self.__timestamps) > 0:
+            run = np.array(self.__bars['strategy.run'])
+            for k in np.argsort(run)[::-1][:HOT_SPOTS].tolist():
+                inner = {s: self.__bars[s][k] for s in self.__stages if s != 'strategy.run'}
+                hot_spots.append({
+                    'time': str(self.__timestamps[k]),
+                    'strategy.run': float(run[k]),
+                    'stage': max(inner, key=inner.get) if len(inner) > 0 else None,
+                    'stages': inner
+                })
+
+        return {
+            'bars': len(self.__timestamps),
+            # Stages sorted by total time
+            'stages': dict(sorted(stages.items(), key=lambda s: s[1]['total'], reverse=True)),
+            'hot_spots': hot_spots
+        }
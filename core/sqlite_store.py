@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from core.order_manager import OrderManager
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS record (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    id,
+    client_order_id,
+    timestamp INTEGER,
+    symbol TEXT,
+    side TEXT,
+    amount REAL,
+    price REAL,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_name ON orders (name, seq);
+CREATE INDEX IF NOT EXISTS orders_id ON orders (id);
+CREATE INDEX IF NOT EXISTS orders_timestamp ON orders (timestamp);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+# Columns of orders in order of the order model
+COLUMNS = ['id', 'client_order_id', 'timestamp', 'symbol', 'side', 'amount', 'price', 'type']
+
+
+# SQLite store of runtime state (alternative to orders.json, info.json and setting.json)
+# Order records have the same interface as OrderManager. State (info, setting) is stored as JSON values by key.
+# The database is in WAL mode, shared by scheduled jobs through one connection.
+class SQLiteStore(object):
+
+    def __init__(self, db_path: str):
+        self.__connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        self.__connection.execute('PRAGMA busy_timeout=5000')
+        self.__connection.executescript(SCHEMA)
+
+        self.__lock = threading.RLock()
+        # Depth of nested batches (one transaction for the outermost)
+        self.__depth = 0
+
+    # Run all changes in one transaction
+    @contextmanager
+    def batch(self):
+        with self.__lock:
+            if self.__depth == 0:
+                self.__connection.execute('BEGIN IMMEDIATE')
+            self.__depth += 1
+            try:
+                yield self.__connection
+            except BaseException:
+                self.__depth -= 1
+                if self.__depth == 0:
+                    self.__connection.execute('ROLLBACK')
+                raise
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.__connection.execute('COMMIT')
+
+    def create(self, name: str, order):
+        with self.batch() as c:
+            c.execute('INSERT OR IGNORE INTO record VALUES (?)', (name,))
+            self.__insert(c, name, [order])
+
+    def remove(self, name: str, o_id):
+        with self.batch() as c:
+            c.execute('DELETE FROM orders WHERE name = ? AND id = ?', (name, o_id))
+
+    # Replace old order (by id) with new order
+    def replace(self, name: str, o_id, new_order):
+        with self.batch() as c:
+            if c.execute('SELECT 1 FROM record WHERE name = ?', (name,)).fetchone() is not None:
+                c.execute('DELETE FROM orders WHERE name = ? AND id = ?', (name, o_id))
+                self.__insert(c, name, [new_order])
+
+    def remove_last(self, name: str):
+        with self.batch() as c:
+            c.execute('DELETE FROM orders WHERE seq = (SELECT MAX(seq) FROM orders WHERE name = ?)', (name,))
+
+    def clear(self, name: str):
+        with self.batch() as c:
+            c.execute('DELETE FROM orders WHERE name = ?', (name,))
+
+    def get_length(self, name: str) -> int:
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM orders WHERE name = ?', (name,)).fetchone()[0]
+
+    # Get all orders with name
+    def get_orders(self, name: str) -> list:
+        with self.__lock:
+            rows = self.__connection.execute(f'SELECT {", ".join(COLUMNS)} FROM orders WHERE name = ? ORDER BY seq',
+                                             (name,)).fetchall()
+        return [self.__order(r) for r in rows]
+
+    # get all orders
+    def get_all(self) -> dict:
+        with self.__lock:
+            names = self.__connection.execute('SELECT name FROM record').fetchall()
+            rows = self.__connection.execute(f'SELECT name, {", ".join(COLUMNS)} FROM orders ORDER BY seq').fetchall()
+        orders = {name: [] for name, in names}
+        for r in rows:
+            orders[r[0]].append(self.__order(r[1:]))
+        return orders
+
+    # Get orders of all names created in [start, end] (timestamps in ms)
+    def get_orders_between(self, start: int, end: int) -> list:
+        with self.__lock:
+            rows = self.__connection.execute(f'SELECT {", ".join(COLUMNS)} FROM orders WHERE timestamp BETWEEN ? AND ? '
+                                             f'ORDER BY timestamp, seq', (start, end)).fetchall()
+        return [self.__order(r) for r in rows]
+
+    # Get state value by key (default if not stored)
+    def get_state(self, key: str, default=None):
+        with self.__lock:
+            row = self.__connection.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set_state(self, key: str, value):
+        with self.batch() as c:
+            c.execute('INSERT OR REPLACE INTO state VALUES (?, ?)', (key, json.dumps(value)))
+
+    # Set fields of a dict state value (read and written in one transaction)
+    def update_state(self, key: str, fields: dict):
+        with self.batch():
+            value = self.get_state(key, {})
+            value.update(fields)
+            self.set_state(key, value)
+
+    # Import runtime JSON files (files not existing are skipped)
+    def import_json(self, orders_path: str, info_path: str, setting_path: str):
+        with self.batch() as c:
+            if os.path.exists(orders_path):
+                # Recovered with the journal (without compacting)
+                for name, orders in OrderManager.load(orders_path).items():
+                    c.execute('INSERT OR IGNORE INTO record VALUES (?)', (name,))
+                    self.__insert(c, name, orders)
+            for key, path in [('info', info_path), ('setting', setting_path)]:
+                if os.path.exists(path):
+                    with open(path) as state_file:
+                        self.set_state(key, json.load(state_file))
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    @staticmethod
+    def __insert(c: sqlite3.Connection, name: str, orders: list):
+        c.executemany(f'INSERT INTO orders (name, {", ".join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                      [(name,) + tuple(OrderManager.sim_order(o).values()) for o in orders])
+
+    @staticmethod
+    def __order(row) -> dict:
+        return OrderManager.sim_order(dict(zip(COLUMNS, row), clientOrderId=row[1]))
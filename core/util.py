@@ -1,3 +1,7 @@
+import functools
+import os
+import tempfile
+import threading
 from datetime import datetime
 
 
@@ -34,3 +38,46 @@ def parse_timeframe(timeframe: str) -> int:
     else:
         raise Exception('timeframe unit {} is not supported'.format(unit))
     return amount * scale
+
+
+# Timestamp (ms) of a bar, converted to datetime only on demand
+# Formats like datetime and forwards other datetime attributes (e.g. year, strftime) to the converted datetime
+class BarTime(int):
+
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self / 1000)
+
+    def __str__(self):
+        return str(self.datetime)
+
+    def __getattr__(self, name):
+        return getattr(self.datetime, name)
+
+
+# Replace the file with text at once (readers see either the old or the new content, never a partial write)
+def write_atomic(path: str, text: str):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as outfile:
+            outfile.write(text)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# Lock of strategy jobs (strategy and trigger of scheduled runs read and change the same order records)
+strategy_lock = threading.Lock()
+
+
+# Run job holding the strategy lock
+def serialized(job):
+    @functools.wraps(job)
+    def run(*args, **kwargs):
+        with strategy_lock:
+            return job(*args, **kwargs)
+
+    return run
@@ -0,0 +1,67 @@
+import json
+import math
+import os
+
+import numpy as np
+
+from core import history
+from core.util import parse_timeframe
+
+# K-lines shown before and after the backtesting range
+MARGIN = 500
+
+# Max k-lines of the overview (OHLC aggregated beyond)
+POINTS = 2000
+
+# K-lines per full resolution chunk
+CHUNK = 5000
+
+
+# Index range [a, b) of the backtesting range with margin
+def window(h: history.History, start: int, end: int, margin: int = MARGIN):
+    a = int(np.searchsorted(h.timestamp, start, side='left'))
+    b = int(np.searchsorted(h.timestamp, end, side='right'))
+    return max(a - margin, 0), min(b + margin, len(h))
+
+
+# Write k-line scripts of the window
+# The overview script (K_LINE_DATA) aggregates k-lines to at most <points> k-lines, full resolution chunks
+# (K_LINE_CHUNKS[key]) are written to <chunk_dir> and loaded on zoom
+def write_k_line(h: history.History, timeframe: str, a: int, b: int, script_path: str, chunk_dir: str,
+                 chunk_url: str, points: int = POINTS, chunk: int = CHUNK):
+    part = history.History(h.timestamp[a:b], h.values[:, a:b])
+    period = parse_timeframe(timeframe)
+
+    chunks = []
+    chunk_period = chunk * period * 1000
+    group = math.ceil(len(part) / points)
+    if group > 1:
+        # Aggregate groups of k-lines
+        period *= group
+        overview = history.resample(part, f'{period}s')
+
+        # Chunks are aligned by time to be shared among results
+        # Each chunk covers its whole time range of the full history, so results of other ranges can share it
+        if not os.path.isdir(chunk_dir):
+            os.makedirs(chunk_dir)
+        for key in np.unique(part.timestamp // chunk_period).tolist():
+            i, j = np.searchsorted(h.timestamp, [key * chunk_period, (key + 1) * chunk_period])
+            with open(f'{chunk_dir}{key}.js', 'w') as chunk_script:
+                chunk_script.write(f'K_LINE_CHUNKS[{key}] = ' + json.dumps(h.records(int(i), int(j))))
+            chunks.append(key)
+    else:
+        overview = part
+
+    view = {
+        # K-line period of the overview (ms)
+        'period': period * 1000,
+        # K-line period of full resolution (ms)
+        'full_period': parse_timeframe(timeframe) * 1000,
+        'chunk_period': chunk_period,
+        'chunks': chunks,
+        'chunk_url': chunk_url
+    }
+    with open(script_path, 'w') as k_line_script:
+        k_line_script.write('const K_LINE_DATA = ' + json.dumps(overview.records(0, len(overview))) + ';\n')
+        k_line_script.write('const K_LINE_VIEW = ' + json.dumps(view) + ';\n')
+        k_line_script.write('const K_LINE_CHUNKS = {};\n')
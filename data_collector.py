@@ -1,12 +1,154 @@
 import json
+import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import ccxt
+import numpy as np
 import pandas as pd
+from tenacity import *
+
+from core import history
+from core.util import str_to_timestamp, parse_timeframe
+
+COLUMNS = ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# Record limit per fetch
+LIMIT = 1000
+
+
+# Shared request budget of an exchange (minimum interval between two requests across threads)
+class RateLimiter(object):
+
+    def __init__(self, interval: float):
+        # Interval in milliseconds
+        self.__interval = interval / 1000
+        self.__lock = threading.Lock()
+        self.__next_time = 0.0
+
+    def wait(self):
+        with self.__lock:
+            now = time.monotonic()
+            t = max(now, self.__next_time)
+            self.__next_time = t + self.__interval
+        if t > now:
+            time.sleep(t - now)
+
+
+# Exchange paced by a shared rate limiter, retrying failed requests
+class RateLimitedExchange(object):
+
+    def __init__(self, exchange, limiter: RateLimiter):
+        self.__exchange = exchange
+        self.__limiter = limiter
+
+    @retry(stop=stop_after_attempt(5), wait=wait_random(min=1, max=2),
+           after=after_log(logging.getLogger(__name__), logging.ERROR))
+    def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = None, params=None):
+        self.__limiter.wait()
+        return self.__exchange.fetch_ohlcv(symbol, timeframe, limit=limit, params={} if params is None else params)
+
+
+# Fetch records in [start_time, end_time] from old to new
+def fetch_forward(exchange, symbol: str, interval: str, start_time: int, end_time: int) -> list:
+    pages = []
+    current_time = start_time
+    while current_time < end_time:
+        print(f'{symbol} {interval} {datetime.fromtimestamp(current_time / 1000)}')
+        rec = exchange.fetch_ohlcv(symbol, interval, limit=LIMIT,
+                                   params={'startTime': current_time, 'endTime': end_time})
+
+        # Whether data set exists
+        if len(rec) == 0:
+            if len(pages) == 0:
+                raise Exception("No data available.")
+            break
+
+        pages.append(rec)
+        current_time = int(rec[-1][0]) + 1
+    return [r for page in pages for r in page]
+
+
+# Fetch records in [start_time, end_time] from new to old (COIN-M data)
+def fetch_backward(exchange, symbol: str, interval: str, start_time: int, end_time: int) -> list:
+    pages = []
+    current_time = end_time
+    while start_time < current_time:
+        print(f'{symbol} {interval} {datetime.fromtimestamp(current_time / 1000)}')
+        rec = exchange.fetch_ohlcv(symbol, interval, limit=LIMIT,
+                                   params={'startTime': start_time, 'endTime': current_time})
+
+        # Whether data set exists
+        if len(rec) == 0:
+            if len(pages) == 0:
+                raise Exception("No data available.")
+            break
+
+        pages.append(rec)
+        current_time = int(rec[0][0]) - 1
+    return [r for page in reversed(pages) for r in page]
+
+
+# Collect records into <path>.csv and <path>.bin, only fetching records after the last stored one
+# Return number of new records
+def collect(exchange, symbol: str, interval: str, start_time: int, end_time: int, path: str,
+            backward: bool = False) -> int:
+    stored = None
+    if os.path.exists(f'{path}.csv'):
+        stored = history.load(path)
+        if len(stored) > 0:
+            # Continue from the k-line after the last stored record (nothing to fetch if it is beyond the end)
+            start_time = max(start_time, int(stored.timestamp[-1]) + parse_timeframe(interval) * 1000)
+
+    fetch = fetch_backward if backward else fetch_forward
+    rec = fetch(exchange, symbol, interval, start_time, end_time) if start_time < end_time else []
+
+    new = pd.DataFrame(rec, columns=COLUMNS)
+    new['Timestamp'] = new['Timestamp'].astype(np.int64)
+
+    # Only keep complete k-lines in range (the latest one may be unfinished)
+    now = int(time.time() * 1000)
+    new = new[(new['Timestamp'] >= start_time) & (new['Timestamp'] + parse_timeframe(interval) * 1000 <= now)]
+    new = new.drop_duplicates('Timestamp').sort_values('Timestamp', ignore_index=True)
+
+    if stored is None:
+        new.to_csv(f'{path}.csv', index=False)
+        history.write_binary(f'{path}.bin', history.from_frame(new))
+    elif len(new) > 0:
+        # Append new records
+        new.to_csv(f'{path}.csv', mode='a', header=False, index=False)
+        appended = history.from_frame(new)
+        history.write_binary(f'{path}.bin', history.History(
+            np.concatenate([stored.timestamp, appended.timestamp]),
+            np.concatenate([stored.values, appended.values], axis=1)))
+    return len(new)
+
+
+# Collect all <symbol, interval> pairs concurrently with a bounded thread pool
+# Return <new records by pair, errors by pair>
+def collect_all(exchange, symbols: list, intervals: list, start_time: int, end_time: int, output_dir: str,
+                backward: bool = False, workers: int = 4):
+    jobs = [(symbol, interval) for symbol in symbols for interval in intervals]
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(collect, exchange, symbol, interval, start_time, end_time,
+                                   history.data_path(output_dir, symbol, interval), backward): (symbol, interval)
+                   for symbol, interval in jobs}
+        for f in as_completed(futures):
+            job = futures[f]
+            try:
+                results[job] = f.result()
+                print(f'[{len(results) + len(errors)}/{len(jobs)}] {job[0]} {job[1]}: {results[job]} new records')
+            except Exception as e:
+                # Other pairs go on
+                errors[job] = e
+                print(f'[{len(results) + len(errors)}/{len(jobs)}] {job[0]} {job[1]}: failed ({e})')
+    return results, errors
 
-from core.util import str_to_timestamp
 
 if __name__ == '__main__':
     # Load configuration file
@@ -20,16 +162,23 @@ if __name__ == '__main__':
     if not os.path.exists(config['output_dir']):
         os.makedirs(config['output_dir'])
 
-    # Generate symbol
-    symbol = config['quote'] + '/' + config['base']
+    # Quote currencies and intervals (single value or list)
+    quotes = config['quote'] if isinstance(config['quote'], list) else [config['quote']]
+    intervals = config['interval'] if isinstance(config['interval'], list) else [config['interval']]
+
+    # Generate symbols
+    symbols = []
     futures = ['future', 'delivery']
-    if config['exchange_type'] in futures and config['quarterly'] != "":
-        symbol = config['quote'] + config['base'] + "_" + config['quarterly']
+    for quote in quotes:
+        symbol = quote + '/' + config['base']
+        if config['exchange_type'] in futures and config['quarterly'] != "":
+            symbol = quote + config['base'] + "_" + config['quarterly']
+        symbols.append(symbol)
 
     # symbol="ETH-USD-210625"
-    # Initialize exchange
+    # Initialize exchange (requests are paced by the shared rate limiter instead)
     exchange_param = {
-        'enableRateLimit': True,
+        'enableRateLimit': False,
         'options': {
             'defaultType': config['exchange_type'],
         },
@@ -45,44 +194,8 @@ if __name__ == '__main__':
     start_time = str_to_timestamp(config['start_time'])
     end_time = min(str_to_timestamp(config['end_time']), int(time.time() * 1000))
 
-    if config['exchange_type'] != 'delivery':
-        current_time = start_time
-
-        history = pd.DataFrame([], columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        while current_time < end_time:
-            print(datetime.fromtimestamp(current_time / 1000))
-            rec = pd.DataFrame(exchange.fetch_ohlcv(symbol, config['interval'],
-                                                    limit=1000,
-                                                    params={'startTime': current_time, 'endTime': end_time}),
-                               columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-
-            # Whether data set exists
-            if len(rec) == 0:
-                raise Exception("No data available.")
-
-            history = pd.concat([history, rec], ignore_index=True)
-            current_time = int(rec.iloc[-1]['Timestamp'])
-
-    else:
-        # COIN-M data
-        current_time = end_time
-        last_time = start_time
-
-        history = pd.DataFrame([], columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        while start_time < current_time and last_time != current_time:
-            print(datetime.fromtimestamp(current_time / 1000))
-            rec = pd.DataFrame(exchange.fetch_ohlcv(symbol, config['interval'],
-                                                    limit=1000,
-                                                    params={'startTime': start_time, 'endTime': current_time}),
-                               columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-
-            # Whether data set exists
-            if len(rec) == 0:
-                raise Exception("No data available.")
-
-            history = pd.concat([history, rec], ignore_index=True).sort_values('Timestamp')
-            last_time = current_time
-            current_time = int(rec.iloc[0]['Timestamp'])
-
-    history.drop_duplicates(inplace=True, ignore_index=True)
-    history.to_csv(f'{config["output_dir"]}{symbol.replace("/", "")}_{config["interval"]}.csv', index=False)
+    results, errors = collect_all(RateLimitedExchange(exchange, RateLimiter(exchange.rateLimit)), symbols, intervals,
+                                  start_time, end_time, config['output_dir'],
+                                  backward=config['exchange_type'] == 'delivery', workers=config.get('workers', 4))
+    if len(errors) > 0:
+        raise Exception(f'Failed to collect {", ".join(f"{s} {i}" for s, i in errors.keys())}')
@@ -0,0 +1,18 @@
+import glob
+import json
+import sys
+
+from core.history import convert
+
+# Convert CSV history to binary format (memory-mapped by backtesting)
+# Usage: data_converter.py [CSV files] (all CSV files in the data directory by default)
+if __name__ == '__main__':
+    paths = sys.argv[1:]
+    if len(paths) == 0:
+        # Load configuration file
+        with open('./backtest_config.json') as f:
+            config = json.load(f)
+        paths = sorted(glob.glob(f'{config["data_dir"]}*.csv'))
+
+    for path in paths:
+        print(f'{path} -> {convert(path)}')
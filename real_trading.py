@@ -7,6 +7,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.blocking import BlockingScheduler
 
 from bot.emulate_bot import EmulateBot
+from core.util import serialized
 from strategy.example.VTCompLong import VTCompLong
 
 
@@ -22,7 +23,7 @@ def schedule_strategy_trigger(strategy):
     # Schedule strategy trigger (trigger special events between two strategy executions)
     scheduler = BackgroundScheduler()
     # Per 1 minute (offset 15 seconds)
-    scheduler.add_job(strategy.run_trigger, 'cron', minute='*/1', second='15')
+    scheduler.add_job(serialized(strategy.run_trigger), 'cron', minute='*/1', second='15')
 
     scheduler.start()
 
@@ -35,7 +36,7 @@ def schedule_strategy(strategy):
     # scheduler.add_job(job, 'cron', hour='*/1', second='10')
 
     # Per 15 minutes (offset 3 seconds)
-    scheduler.add_job(strategy.run, 'cron', minute='*/15', second='3')
+    scheduler.add_job(serialized(strategy.run), 'cron', minute='*/15', second='3')
 
     # Every 3 seconds for test
     # scheduler.add_job(strategy.run, 'interval', seconds=3)
@@ -0,0 +1,27 @@
+import argparse
+import json
+import os
+
+from core.plot import render
+
+# Batch render entry point
+# Render PnL figures of backtesting results from their raw PnL information
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('result_dirs', nargs='*', help='result directories (default: all unrendered results)')
+    args = parser.parse_args()
+
+    result_dirs = [os.path.join(d, '') for d in args.result_dirs]
+    if len(result_dirs) == 0:
+        # Load configuration file
+        with open('./backtest_config.json') as f:
+            config = json.load(f)
+
+        for d in sorted(os.listdir(config['result_dir'])):
+            d = f'{config["result_dir"]}{d}/'
+            if os.path.exists(f'{d}raw/pnl.json') and not os.path.exists(f'{d}pnl_history.svg'):
+                result_dirs.append(d)
+
+    for d in result_dirs:
+        render(d)
+        print(f'Rendered {d}')
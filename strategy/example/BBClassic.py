@@ -1,6 +1,8 @@
 import logging
 from datetime import datetime
 
+import talib as ta
+
 from core import trade_lib as tl
 from strategy.example.indicator.BBClassicIndicator import Indicator
 
@@ -31,6 +33,9 @@ class BBClassic(object):
     def __init__(self, bot):
         self.__bot = bot
 
+        # Order list is per instance (a process may run many backtests)
+        self.__long_order = []
+
     def __long(self, i: Indicator):
         if len(self.__long_order) < self.__max_open_order:
             # Executable
@@ -50,8 +55,6 @@ class BBClassic(object):
                 else:
                     logging.error("Failed to close order.")
 
-    __long_order = []
-
     # Execute strategy
     def run(self, current_time: datetime = None):
         # TODO Check connection
@@ -63,7 +66,7 @@ class BBClassic(object):
         self.__bot.cancel_unfilled_orders(self.__symbol, self.__max_open_order)
 
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
@@ -76,6 +79,20 @@ class BBClassic(object):
         # Run long strategy
         self.__long(indicator)
 
+    # Entry and exit signals over the whole history (vectorized backtesting)
+    def signals(self, records):
+        close = records.close
+        bb = ta.BBANDS(close, timeperiod=60, nbdevup=2, nbdevdn=2)
+        return dict(
+            time_frame=self.__time_frame,
+            max_open_order=self.__max_open_order,
+            legs=[
+                dict(symbol=self.__symbol, amount=self.__amount,
+                     entry=tl.crossed_above(close, bb[2]),
+                     exit=tl.crossed_below(close, bb[0]))
+            ]
+        )
+
     @staticmethod
     def __crossed_above(s1, s2) -> bool:
         r = tl.crossed_above(s1, s2)
@@ -32,6 +32,9 @@ class BBCompound(object):
     def __init__(self, bot):
         self.__bot = bot
 
+        # Order list is per instance (a process may run many backtests)
+        self.__long_order = []
+
     def __long(self, i: Indicator):
         if len(self.__long_order) < self.__max_open_order:
             if self.__crossed_above(i.fastMA, i.bbBasis) and i.close[-1] > i.bbBasis[-1] and abs(i.osc) == 1:
@@ -50,8 +53,6 @@ class BBCompound(object):
                 else:
                     logging.error("Failed to close order.")
 
-    __long_order = []
-
     # Execute strategy
     def run(self, current_time: datetime = None):
         # TODO Check connection
@@ -63,7 +64,7 @@ class BBCompound(object):
         self.__bot.cancel_unfilled_orders(self.__symbol, self.__max_open_order)
 
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
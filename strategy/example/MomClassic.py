@@ -25,14 +25,15 @@ class MomClassic(object):
     def __init__(self, bot):
         self.__bot = bot
 
-    __unfilled_long_order_id = []
-    __unfilled_short_order_id = []
+        # Order lists are per instance (a process may run many backtests)
+        self.__unfilled_long_order_id = []
+        self.__unfilled_short_order_id = []
 
-    __unfilled_close_long_order_id = []
-    __unfilled_close_short_order_id = []
+        self.__unfilled_close_long_order_id = []
+        self.__unfilled_close_short_order_id = []
 
-    __long_order_id = []
-    __short_order_id = []
+        self.__long_order_id = []
+        self.__short_order_id = []
 
     # Long Strategy
     def __long(self, i: Indicator):
@@ -113,7 +114,7 @@ class MomClassic(object):
                 self.__short_order_id.pop()
 
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
@@ -1,6 +1,8 @@
 import logging
 from datetime import datetime
 
+import talib as ta
+
 from core import trade_lib as tl
 from strategy.example.indicator.VTClassicLongIndicator import Indicator
 
@@ -34,8 +36,9 @@ class VTClassicLong(object):
     def __init__(self, bot):
         self.__bot = bot
 
-    __long_term_order = []
-    __short_term_order = []
+        # Order lists are per instance (a process may run many backtests)
+        self.__long_term_order = []
+        self.__short_term_order = []
 
     # Long-term Strategy
     def __long_term(self, i: Indicator):
@@ -88,7 +91,7 @@ class VTClassicLong(object):
         self.__bot.cancel_unfilled_orders(self.__symbol, self.__max_open_order)
 
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
@@ -104,6 +107,28 @@ class VTClassicLong(object):
         # Short-term long strategy
         self.__short_term(indicator)
 
+    # Entry and exit signals over the whole history (vectorized backtesting)
+    def signals(self, records):
+        close = records.close
+        ema21 = ta.EMA(close, 21)
+        ema34 = ta.EMA(close, 34)
+        ema144 = ta.EMA(close, 144)
+        ema169 = ta.EMA(close, 169)
+        return dict(
+            time_frame=self.__time_frame,
+            max_open_order=self.__max_open_order,
+            legs=[
+                # Long-term
+                dict(symbol=self.__symbol, amount=self.__amount * self.__long_weight,
+                     entry=tl.crossed_above(close, ema144) & (ema144 > ema169),
+                     exit=tl.crossed_below(close, ema144) & (ema144 < ema169)),
+                # Short-term
+                dict(symbol=self.__symbol, amount=self.__amount,
+                     entry=tl.crossed_above(close, ema21) & (ema21 > ema34),
+                     exit=tl.crossed_below(close, ema21) & (ema21 < ema34))
+            ]
+        )
+
     # Buy order
     # TODO make a suitable order
     def __buy(self, weight: float = 1):
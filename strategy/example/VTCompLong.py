@@ -2,7 +2,8 @@ import logging
 from datetime import datetime
 
 from core import trade_lib as tl
-from strategy.example.indicator.VTCompLongIndicator import Indicator, IndicatorCheck
+from strategy.example.indicator.VTCompLongIndicator import Indicator, IndicatorCheck, StreamIndicator, \
+    StreamIndicatorCheck
 
 
 # Vegas Tunnel Compound Strategy (long)
@@ -32,6 +33,9 @@ class VTCompLong(object):
     # Indicator length limit (Reserve last __indicator_limit elements)
     __indicator_length_limit = 10
 
+    # Update indicators with new k-lines only instead of recalculating them over every fetch
+    __incremental_indicator = True
+
     # Max number of open orders (included)
     __max_open_order = __setting['max_open_order']
 
@@ -40,6 +44,8 @@ class VTCompLong(object):
 
     def __init__(self, bot):
         self.__bot = bot
+        # Incremental indicators
+        self.__stream = StreamIndicator(self.__indicator_length_limit)
         # Create strategy setting
         bot.create_setting(self.__setting)
 
@@ -156,7 +162,7 @@ class VTCompLong(object):
         self.__bot.cancel_unfilled_orders(self.__symbol, self.__max_open_order)
 
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
@@ -165,6 +171,7 @@ class VTCompLong(object):
 
         # Load settings
         setting = self.__bot.get_setting()
+        self.__max_open_order = setting['max_open_order']
 
         # Load orders
         orders = self.__get_all_orders()
@@ -178,7 +185,10 @@ class VTCompLong(object):
             short_term_1_orders)
 
         # Calculate indicators
-        indicator = Indicator(rec, self.__indicator_length_limit)
+        if self.__incremental_indicator:
+            indicator = self.__stream.update(rec)
+        else:
+            indicator = Indicator(rec, self.__indicator_length_limit)
 
         # Long-term long strategy 1
         self.__long_term_1(indicator, setting, long_term_1_orders)
@@ -195,7 +205,7 @@ class VTCompLong(object):
     # Strategy trigger (running in a high frequency)
     def run_trigger(self):
         # Fetch records
-        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit)
+        rec = self.__bot.get_ohlcv(self.__symbol, self.__time_frame, self.__record_limit, columnar=True)
 
         # Suspend running if the number of records is below the requirement
         if len(rec) < self.__record_limit:
@@ -203,7 +213,10 @@ class VTCompLong(object):
             return
 
         # Calculate indicators
-        i = IndicatorCheck(rec, self.__indicator_length_limit)
+        if self.__incremental_indicator:
+            i = StreamIndicatorCheck(self.__stream, rec, self.__indicator_length_limit)
+        else:
+            i = IndicatorCheck(rec, self.__indicator_length_limit)
 
         # Load orders
         all_orders = self.__get_all_orders()
@@ -1,24 +1,26 @@
 import numpy as np
 import talib as ta
 
+from core.model import to_ohlcv
+
 
 # Indicators for Vegas Tunnel Classic Strategy
 class Indicator:
     def __init__(self, records, length_limit):
         # Ignore current time point record (only consider complete k-lines)
-        records = records[:-1]
+        records = to_ohlcv(records)[:-1]
 
         # Open Price List
-        self.open = np.asarray([r[1] for r in records])
+        self.open = records.open
 
         # High Price List
-        self.high = np.asarray([r[2] for r in records])
+        self.high = records.high
 
         # Low Price List
-        self.low = np.asarray([r[3] for r in records])
+        self.low = records.low
 
         # Close Price List
-        self.close = np.asarray([r[4] for r in records])
+        self.close = records.close
 
         # EMA (Close)
         self.ema21 = fill_none(ta.EMA(self.close, 21)[-length_limit:])
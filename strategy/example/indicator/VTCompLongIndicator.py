@@ -1,26 +1,33 @@
+import threading
+from collections import deque
+
 import numpy as np
 import talib as ta
 
 from talib._ta_lib import MA_Type
 
+from core import indicator as ind
+from core.history import OHLC
+from core.model import to_ohlcv
+
 
 # Indicators for Vegas Tunnel Compound Strategy (long)
 class Indicator:
     def __init__(self, records, length_limit):
         # Ignore current time point record (only consider complete k-lines)
-        records = records[:-1]
+        records = to_ohlcv(records)[:-1]
 
         # Open Price List
-        self.open = np.asarray([r[1] for r in records])
+        self.open = records.open
 
         # High Price List
-        self.high = np.asarray([r[2] for r in records])
+        self.high = records.high
 
         # Low Price List
-        self.low = np.asarray([r[3] for r in records])
+        self.low = records.low
 
         # Close Price List
-        self.close = np.asarray([r[4] for r in records])
+        self.close = records.close
 
         # MACD DIF (Close)
         self.macd_dif = fill_none(ta.MACD(self.close, 48, 56)[0][-length_limit:])[-1]
@@ -46,11 +53,12 @@ class Indicator:
 # Indicator for check
 class IndicatorCheck:
     def __init__(self, records, length_limit):
+        records = to_ohlcv(records)
         last = records[-1]
 
         # Close Price List
         # Ignore current time point record for calculating indicators(only consider complete k-lines)
-        self.close = np.asarray([r[4] for r in records[:-1]])
+        self.close = records[:-1].close
 
         self.ema144 = fill_none(ta.EMA(self.close, 144)[-length_limit:])
         self.ema576 = fill_none(ta.EMA(self.close, 576)[-length_limit:])
@@ -66,5 +74,95 @@ class IndicatorCheck:
         self.close = self.close[-length_limit:]
 
 
+# Incremental indicators for Vegas Tunnel Compound Strategy (long)
+# Indicators whose values do not depend on the fetched window (MACD, EMA36, Bollinger Bands) are seeded once from
+# history and updated only with new complete k-lines. Their seeds weigh less than 1e-14 after the 999 complete k-lines
+# of a fetch, so they equal Indicator on every window.
+# Long EMAs (144, 169, 576, 676) still depend on where the window starts and are calculated over each fetch as
+# Indicator does.
+class StreamIndicator:
+    # Periods of EMAs calculated over each fetch
+    WINDOWED_EMA = (144, 169, 576, 676)
+
+    def __init__(self, length_limit):
+        self.__length_limit = length_limit
+
+        # Timestamp of the last complete k-line fed
+        self.__last_time = None
+
+        # Strategy execution and trigger may run in different threads
+        self.__lock = threading.Lock()
+
+        self.__reset()
+
+    def __reset(self):
+        self.__macd = ind.MACD(48, 56)
+        self.__ema36 = ind.EMA(36)
+        self.__bb = ind.BBands(20, 2, 2)
+
+        # Recent values (last length_limit complete k-lines)
+        self.__series = {name: deque(maxlen=self.__length_limit) for name in
+                         ('open', 'high', 'low', 'close', 'ema36', 'bbUpper', 'bbLower')}
+
+    # Feed new complete k-lines and refresh indicator values
+    def update(self, records):
+        with self.__lock:
+            return self.__update(to_ohlcv(records))
+
+    def __update(self, records):
+        complete = records[:-1]
+        timestamp = complete.timestamp
+        if len(timestamp) == 0:
+            return self
+
+        # Continue from the last fed k-line, or seed again if it is not in the records (first run or a gap)
+        start = 0
+        if self.__last_time is not None:
+            start = int(np.searchsorted(timestamp, self.__last_time, side='right'))
+            if start == 0 or timestamp[start - 1] != self.__last_time:
+                start = 0
+        if start == 0:
+            self.__reset()
+
+        s = self.__series
+        rows = complete.values[:OHLC, start:].T.tolist()
+        for o, h, l, c in rows:
+            self.__macd.update(c)
+            s['ema36'].append(self.__ema36.update(c))
+            self.__bb.update(c)
+            s['bbUpper'].append(self.__bb.upper)
+            s['bbLower'].append(self.__bb.lower)
+            s['open'].append(o)
+            s['high'].append(h)
+            s['low'].append(l)
+            s['close'].append(c)
+        self.__last_time = timestamp[-1]
+
+        # Same attributes as Indicator
+        self.macd_dif = self.__macd.macd
+        for name, values in s.items():
+            setattr(self, name, np.asarray(values))
+        for p in self.WINDOWED_EMA:
+            setattr(self, f'ema{p}', fill_none(ta.EMA(complete.close, p)[-self.__length_limit:]))
+
+        # Latest (unfinished) k-line close for checks between two executions
+        self.latest_close = records[-1][4]
+        return self
+
+
+# Indicator for check from incremental indicators
+class StreamIndicatorCheck:
+    def __init__(self, stream: StreamIndicator, records, length_limit):
+        stream.update(records)
+
+        self.ema144 = stream.ema144
+        self.ema576 = stream.ema576
+        self.bbUpper = stream.bbUpper
+        self.bbLower = stream.bbLower
+
+        # Append the latest record
+        self.close = np.append(stream.close, stream.latest_close)[-length_limit:]
+
+
 def fill_none(series, value=0) -> np.ndarray:
     return np.asarray([value if v is None else v for v in series])
@@ -0,0 +1,116 @@
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from backtesting import load_strategy, run_backtest
+from bot.backtest_bot import BackTestBot
+from core import history
+from core.util import str_to_date
+
+# Worker state: <configuration, shared history (pair and interval)>
+_worker = {}
+
+
+# Generate settings from grid (all combinations or a random sample)
+def generate_settings(sweep_config) -> list:
+    grid = sweep_config['grid']
+    keys = list(grid.keys())
+    settings = [dict(zip(keys, values)) for values in itertools.product(*[grid[k] for k in keys])]
+
+    samples = sweep_config.get('samples', 0)
+    if 0 < samples < len(settings):
+        settings = random.Random(sweep_config.get('seed', 0)).sample(settings, samples)
+    return settings
+
+
+# Run one backtest with the setting and return the performance summary
+def run_setting(config, setting: dict, start: datetime, end: datetime, h: history.History = None) -> dict:
+    config = dict(config, setting=setting)
+    bot = BackTestBot(config)
+    if h is not None:
+        bot.set_history(config['pair'], config['interval'], h)
+
+    strategy = load_strategy(config)(bot)
+
+    # Only settings created by the strategy (bot.create_setting) can be swept
+    unknown = [k for k in setting if k not in bot.get_setting()]
+    if len(unknown) > 0:
+        raise Exception(f'{config["strategy"]} has no setting {", ".join(unknown)} (settings: '
+                        f'{", ".join(bot.get_setting()) or "none"}).')
+
+    run_backtest(bot, strategy, config, start, end)
+
+    perf = bot.get_performance(start, end)
+    delattr(perf, 'pnl_history')
+    delattr(perf, 'cum_pnl_history')
+    delattr(perf, 'symbol_perf')
+    return {**bot.get_setting(), **perf.__dict__}
+
+
+def init_worker(config, descriptor):
+    # Keep shared memory open in the worker
+    shm, h = history.attach(descriptor)
+    _worker['config'] = config
+    _worker['shm'] = shm
+    _worker['history'] = h
+
+
+def run_worker(setting: dict, start: datetime, end: datetime) -> dict:
+    return run_setting(_worker['config'], setting, start, end, _worker['history'])
+
+
+# Load history of the pair once and copy it into shared memory for workers
+def share_history(config):
+    return history.share(history.load_timeframe(config['data_dir'], config['pair'], config['interval']))
+
+
+# Run backtests of all settings in a process pool sharing one copy of the history
+def sweep(config, settings: list, start: datetime, end: datetime, processes: int = None) -> pd.DataFrame:
+    shm, descriptor = share_history(config)
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                                 initargs=(config, descriptor)) as executor:
+            futures = [executor.submit(run_worker, s, start, end) for s in settings]
+            results = []
+            for i, f in enumerate(futures):
+                results.append(f.result())
+                print(f'{i + 1}/{len(settings)} {settings[i]}')
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.DataFrame(results)
+
+
+# Parameter sweep entry point
+if __name__ == "__main__":
+    # Load configuration file
+    with open('./backtest_config.json') as f:
+        config = json.load(f)
+
+    # Create result directory
+    if not os.path.isdir(config['result_dir']):
+        os.mkdir(config['result_dir'])
+
+    # Create output directory
+    result_dir = f'{config["result_dir"]}sweep_{datetime.now()}/'
+    os.mkdir(result_dir)
+
+    sweep_config = config['sweep']
+    settings = generate_settings(sweep_config)
+    print(f'Sweeping {len(settings)} settings')
+
+    summary = sweep(config, settings, str_to_date(config['start_time']), str_to_date(config['end_time']),
+                    sweep_config.get('processes'))
+
+    # Store performance summary of all settings
+    summary.to_csv(f'{result_dir}summary.csv', index=False)
+    with open(f'{result_dir}sweep.json', 'w') as outfile:
+        json.dump(sweep_config, outfile, indent=4)
+    print(f'Output summary to {result_dir}')
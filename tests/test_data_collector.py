@@ -0,0 +1,182 @@
+import threading
+import time
+
+import ccxt
+import numpy as np
+import pytest
+from tenacity import wait_none
+
+import data_collector
+from core import history
+
+# First k-line of stub records (ms)
+START = 1609459200000
+
+MINUTE = 60000
+
+# Records of the stub exchange (more than two pages)
+LENGTH = 2500
+
+
+# Local stub of an exchange serving 1m k-lines of each symbol in [startTime, endTime]
+# Pages are the oldest records of the range, or the newest ones if newest_first (as COIN-M data is fetched)
+# Requests of a symbol fail failures[symbol] times first (-1: always), each request takes delay seconds
+class StubExchange(object):
+
+    def __init__(self, records: dict, newest_first: bool = False, failures: dict = None, delay: float = 0):
+        # Records by symbol
+        self.records = records
+        self.newest_first = newest_first
+        self.failures = {} if failures is None else dict(failures)
+        self.delay = delay
+        # Requests: <symbol, timeframe, startTime, endTime>
+        self.requests = []
+        # Start time of each request (monotonic clock)
+        self.times = []
+        # Max number of requests in progress at the same time
+        self.max_in_flight = 0
+        self.__in_flight = 0
+        self.__lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = None, params=None):
+        with self.__lock:
+            self.requests.append((symbol, timeframe, params['startTime'], params['endTime']))
+            self.times.append(time.monotonic())
+            self.__in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.__in_flight)
+            failing = self.failures.get(symbol, 0) != 0
+            if self.failures.get(symbol, 0) > 0:
+                self.failures[symbol] -= 1
+        try:
+            time.sleep(self.delay)
+            if failing:
+                raise ccxt.NetworkError(f'{symbol} unavailable')
+            rec = [r for r in self.records[symbol] if params['startTime'] <= r[0] <= params['endTime']]
+            return rec[-limit:] if self.newest_first else rec[:limit]
+        finally:
+            with self.__lock:
+                self.__in_flight -= 1
+
+
+# Random walk 1m k-lines [timestamp, open, high, low, close, volume] (prices in cents as served by exchanges)
+def stub_records(length: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.001, length))), 2)
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.round(np.maximum(open_, close) * 1.001, 2)
+    low = np.round(np.minimum(open_, close) * 0.999, 2)
+    volume = np.round(rng.uniform(1, 100, length), 3)
+    return [[START + i * MINUTE] + v for i, v in enumerate(np.column_stack([open_, high, low, close, volume]).tolist())]
+
+
+# End time of the first n records
+def end_of(n: int) -> int:
+    return START + (n - 1) * MINUTE
+
+
+# Stored CSV and binary files hold exactly the records
+def assert_stored(path: str, records: list):
+    expected = history.from_frame(data_collector.pd.DataFrame(records, columns=data_collector.COLUMNS))
+    for h in (history.read_csv(f'{path}.csv'), history.read_binary(f'{path}.bin')):
+        assert np.array_equal(h.timestamp, expected.timestamp)
+        assert np.array_equal(h.values, expected.values)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'BTCUSDT_1m')
+
+
+def test_first_run(path):
+    records = stub_records(LENGTH)
+    exchange = StubExchange({'BTC/USDT': records})
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(LENGTH), path) == LENGTH
+    assert_stored(path, records)
+
+    # Pages follow each other
+    starts = [r[2] for r in exchange.requests]
+    assert starts[0] == START
+    assert starts == sorted(starts) and len(starts) <= LENGTH // data_collector.LIMIT + 2
+
+
+def test_append(path):
+    records = stub_records(LENGTH)
+    exchange = StubExchange({'BTC/USDT': records[:1500]})
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(1500), path) == 1500
+
+    # Only records after the last stored one are fetched
+    exchange = StubExchange({'BTC/USDT': records})
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(LENGTH), path) == LENGTH - 1500
+    assert exchange.requests[0][2] == records[1500][0]
+    assert_stored(path, records)
+
+
+def test_repeat_run_makes_no_request(path):
+    records = stub_records(LENGTH)
+    data_collector.collect(StubExchange({'BTC/USDT': records}), 'BTC/USDT', '1m', START, end_of(LENGTH), path)
+
+    # Up to the start of the next k-line (e.g. an end time at midnight)
+    exchange = StubExchange({'BTC/USDT': records})
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(LENGTH + 1), path) == 0
+    assert exchange.requests == []
+    assert_stored(path, records)
+
+
+def test_backward(path):
+    more = stub_records(LENGTH + 700)
+    records = more[:LENGTH]
+    exchange = StubExchange({'BTC/USDT': records}, newest_first=True)
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(LENGTH), path, backward=True) == LENGTH
+    assert_stored(path, records)
+
+    # Pages go from new to old
+    ends = [r[3] for r in exchange.requests]
+    assert ends[0] == end_of(LENGTH)
+    assert ends == sorted(ends, reverse=True)
+
+    # Append backward as well
+    exchange = StubExchange({'BTC/USDT': more}, newest_first=True)
+    assert data_collector.collect(exchange, 'BTC/USDT', '1m', START, end_of(LENGTH + 700), path, backward=True) == 700
+    assert_stored(path, more)
+
+
+# Retry failed requests without waiting
+@pytest.fixture
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(data_collector.RateLimitedExchange.fetch_ohlcv.retry, 'wait', wait_none())
+
+
+def test_collect_all_failing_pair(tmp_path, no_retry_wait):
+    records = stub_records(LENGTH)
+    stub = StubExchange({'BTC/USDT': records, 'ETH/USDT': records, 'BNB/USDT': records},
+                        failures={'ETH/USDT': -1, 'BNB/USDT': 2})
+    exchange = data_collector.RateLimitedExchange(stub, data_collector.RateLimiter(1))
+    results, errors = data_collector.collect_all(exchange, ['BTC/USDT', 'ETH/USDT', 'BNB/USDT'], ['1m'], START,
+                                                 end_of(LENGTH), f'{tmp_path}/')
+
+    # Failed requests are retried, a pair still failing does not stop the others
+    assert results == {('BTC/USDT', '1m'): LENGTH, ('BNB/USDT', '1m'): LENGTH}
+    assert list(errors.keys()) == [('ETH/USDT', '1m')]
+    assert len([r for r in stub.requests if r[0] == 'ETH/USDT']) == 5
+    assert_stored(f'{tmp_path}/BTCUSDT_1m', records)
+    assert_stored(f'{tmp_path}/BNBUSDT_1m', records)
+    assert not (tmp_path / 'ETHUSDT_1m.csv').exists()
+
+
+def test_collect_all_shares_rate_budget(tmp_path):
+    symbols = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'XRP/USDT']
+    records = stub_records(LENGTH)
+    stub = StubExchange({symbol: records for symbol in symbols}, delay=0.05)
+    interval = 20
+    exchange = data_collector.RateLimitedExchange(stub, data_collector.RateLimiter(interval))
+    results, errors = data_collector.collect_all(exchange, symbols, ['1m'], START, end_of(LENGTH), f'{tmp_path}/',
+                                                 workers=4)
+
+    assert results == {(symbol, '1m'): LENGTH for symbol in symbols} and errors == {}
+
+    # Pairs are collected concurrently, but requests of all threads are paced by one interval
+    assert stub.max_in_flight > 1
+    # (the k-th request starts at least k intervals after the first one, less the scheduling delay of the first one)
+    times = sorted(stub.times)
+    assert all(t - times[0] >= k * interval / 1000 - 0.005 for k, t in enumerate(times))
+    assert len(times) > len(symbols) * (LENGTH // data_collector.LIMIT)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from strategy.example.indicator.VTCompLongIndicator import Indicator, IndicatorCheck, StreamIndicator, \
+    StreamIndicatorCheck
+
+# Records per fetch of VTCompLong
+RECORD_LIMIT = 1000
+
+LENGTH_LIMIT = 10
+
+# Tolerance of streamed values (running sums round differently from TA-Lib)
+TOLERANCE = 1e-8
+
+# Attributes calculated over each fetch (exactly the TA-Lib values)
+EXACT = ['open', 'high', 'low', 'close', 'ema144', 'ema169', 'ema576', 'ema676']
+
+STREAMED = ['ema36', 'bbUpper', 'bbLower', 'macd_dif']
+
+
+# Random walk k-lines [timestamp, open, high, low, close, volume] near 100 (15m)
+def random_records(length: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, length))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, length))
+    timestamp = 1600000000000 + np.arange(length) * 900000
+    return np.column_stack([timestamp, open_, high, low, close, rng.uniform(1, 100, length)]).tolist()
+
+
+# Fetch windows sliding over the records (by 1 or 2 k-lines, and once by more than a fetch to cause a gap)
+def windows(records: list):
+    end = RECORD_LIMIT
+    while end <= len(records):
+        yield records[end - RECORD_LIMIT:end]
+        end += RECORD_LIMIT + 200 if end == 2000 else 1 + end % 2
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_stream_indicator_same_as_indicator(seed):
+    stream = StreamIndicator(LENGTH_LIMIT)
+    for rec in windows(random_records(3500, seed)):
+        expected = Indicator(rec, LENGTH_LIMIT)
+        actual = stream.update(rec)
+        for name in EXACT:
+            assert np.array_equal(getattr(expected, name), getattr(actual, name)), name
+        for name in STREAMED:
+            np.testing.assert_allclose(getattr(actual, name), getattr(expected, name), rtol=0, atol=TOLERANCE,
+                                       err_msg=name)
+
+
+def test_stream_indicator_check_same_as_indicator_check():
+    stream = StreamIndicator(LENGTH_LIMIT)
+    for rec in windows(random_records(2500, 2)):
+        expected = IndicatorCheck(rec, LENGTH_LIMIT)
+        actual = StreamIndicatorCheck(stream, rec, LENGTH_LIMIT)
+        for name in ['close', 'ema144', 'ema576']:
+            assert np.array_equal(getattr(expected, name), getattr(actual, name)), name
+        for name in ['bbUpper', 'bbLower']:
+            np.testing.assert_allclose(getattr(actual, name), getattr(expected, name), rtol=0, atol=TOLERANCE,
+                                       err_msg=name)
@@ -0,0 +1,124 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import sweep
+from core.util import str_to_date, date_to_str, parse_timeframe
+
+
+# Split [start, end] into rolling <in-sample start, in-sample end (out-of-sample start), out-of-sample end> windows
+def split_windows(start: datetime, end: datetime, in_sample: str, out_of_sample: str) -> list:
+    in_sample = timedelta(seconds=parse_timeframe(in_sample))
+    out_of_sample = timedelta(seconds=parse_timeframe(out_of_sample))
+
+    windows = []
+    current = start
+    while current + in_sample + out_of_sample <= end:
+        windows.append((current, current + in_sample, current + in_sample + out_of_sample))
+        current += out_of_sample
+    return windows
+
+
+# Optimize settings in-sample and evaluate the best one out-of-sample (runs in a worker)
+def run_window(window, settings: list, objective: str) -> dict:
+    is_start, is_end, oos_end = window
+
+    best = None
+    for setting in settings:
+        r = sweep.run_worker(setting, is_start, is_end)
+        if best is None or r[objective] > best[objective]:
+            best = r
+
+    setting = {k: best[k] for k in settings[0].keys()}
+    oos = sweep.run_worker(setting, is_end, oos_end)
+
+    result = {
+        'in_sample_start': date_to_str(is_start),
+        'in_sample_end': date_to_str(is_end),
+        'out_of_sample_end': date_to_str(oos_end),
+        'setting': setting
+    }
+    result.update({f'in_sample_{k}': v for k, v in best.items() if k not in setting})
+    result.update({f'out_of_sample_{k}': v for k, v in oos.items() if k not in setting})
+    return result
+
+
+# Load completed windows (by in-sample start)
+def load_completed(path: str) -> dict:
+    completed = {}
+    if os.path.exists(path):
+        with open(path) as windows_file:
+            for line in windows_file:
+                if line.strip() != '':
+                    r = json.loads(line)
+                    completed[r['in_sample_start']] = r
+    return completed
+
+
+# Walk-forward entry point
+if __name__ == "__main__":
+    # Load configuration file
+    with open('./backtest_config.json') as f:
+        config = json.load(f)
+
+    wf_config = config['walk_forward']
+
+    # Create result directory
+    if not os.path.isdir(config['result_dir']):
+        os.mkdir(config['result_dir'])
+
+    # Output directory is fixed per strategy to resume interrupted runs
+    result_dir = f'{config["result_dir"]}walk_forward_{config["strategy"]}_{config["interval"]}/'
+    if not os.path.isdir(result_dir):
+        os.mkdir(result_dir)
+
+    # Refuse to resume with a different configuration
+    run_config = {k: config[k] for k in ('strategy', 'start_time', 'end_time', 'interval', 'pair', 'sweep',
+                                         'walk_forward')}
+    config_path = f'{result_dir}walk_forward.json'
+    if os.path.exists(config_path):
+        with open(config_path) as config_file:
+            if json.load(config_file) != run_config:
+                raise Exception(f'Configuration changed. Remove {result_dir} to restart.')
+    else:
+        with open(config_path, 'w') as outfile:
+            json.dump(run_config, outfile, indent=4)
+
+    windows = split_windows(str_to_date(config['start_time']), str_to_date(config['end_time']),
+                            wf_config['in_sample'], wf_config['out_of_sample'])
+    settings = sweep.generate_settings(config['sweep'])
+    objective = wf_config.get('objective', 'pnl')
+
+    # Skip completed windows
+    windows_path = f'{result_dir}windows.jsonl'
+    completed = load_completed(windows_path)
+    pending = [w for w in windows if date_to_str(w[0]) not in completed]
+    print(f'{len(windows)} windows, {len(completed)} completed, {len(settings)} settings')
+
+    if len(pending) > 0:
+        # Load history once and share it among processes
+        shm, descriptor = sweep.share_history(config)
+
+        try:
+            with ProcessPoolExecutor(max_workers=wf_config.get('processes'), initializer=sweep.init_worker,
+                                     initargs=(config, descriptor)) as executor:
+                futures = [executor.submit(run_window, w, settings, objective) for w in pending]
+                for f in as_completed(futures):
+                    r = f.result()
+                    # Record each window as soon as it completes
+                    with open(windows_path, 'a') as outfile:
+                        outfile.write(json.dumps(r) + '\n')
+                    completed[r['in_sample_start']] = r
+                    print(f'Completed window {r["in_sample_start"]} - {r["out_of_sample_end"]}')
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # Output summary of all windows in time order
+    summary = pd.json_normalize([completed[k] for k in sorted(completed.keys())])
+    summary.to_csv(f'{result_dir}summary.csv', index=False)
+    print(f'Out-of-sample PnL: {summary["out_of_sample_pnl"].sum()}')
+    print(f'Output summary to {result_dir}')